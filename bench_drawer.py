@@ -0,0 +1,152 @@
+"""
+StateDrawの画面ごとの描画時間を計測するベンチマーク
+ヘッドレス(SDLのダミードライバとオフスクリーンのSurface)で描画するので、
+ディスプレイのない環境(CI等)でも
+    $ python bench_drawer.py --frames 200
+等のコマンドで実行できる
+--max-p99を指定すると、描画時間の99パーセンタイルがそれを超えた画面があれば終了コード1で終わる(CI用)
+日本語の描画を計測するため、日本語を描画できるフォントが見つからなければ終了コード1で終わる
+"""
+
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, NamedTuple
+
+import pygame
+from pygame.locals import *
+
+from game.game import JudgeResponse, QuestionResponse
+from materials.drawer import StateDraw
+
+
+class BenchResult(NamedTuple):
+    """1画面分の計測結果を格納する名前付きタプル"""
+
+    name: str  # 画面の名前
+    frames: int  # 描画した回数
+    p50: float  # 描画時間の50パーセンタイル(ミリ秒)
+    p90: float  # 描画時間の90パーセンタイル(ミリ秒)
+    p99: float  # 描画時間の99パーセンタイル(ミリ秒)
+    max: float  # 描画時間の最大値(ミリ秒)
+    alloc_kib: float  # 1回の描画で確保されたメモリの平均(KiB)
+    peak_kib: float  # 計測中に確保されたメモリの最大値(KiB)
+
+    def __str__(self):
+        return "{:<12}{:>7}{:>9.3f}{:>9.3f}{:>9.3f}{:>9.3f}{:>11.1f}{:>10.1f}".format(
+            *self
+        )
+
+
+def post_answer(answer: str) -> None:
+    """解答の入力とエンターキーの押下をイベントとして積む関数"""
+    for x in answer:
+        pygame.event.post(pygame.event.Event(TEXTINPUT, text=x))
+    pygame.event.post(pygame.event.Event(KEYDOWN, key=K_RETURN, unicode="\r"))
+
+
+def bench(name: str, frame: Callable[[int], None], frames: int) -> BenchResult:
+    """
+    frame(i)をframes回呼び、描画時間のパーセンタイルとメモリの確保量を返す関数
+    tracemallocは描画を遅くするので、時間の計測とは別に回す
+    """
+    times: List[float] = []
+    for i in range(frames):
+        start = time.perf_counter()
+        frame(i)
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    for i in range(frames):
+        frame(i)
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 99パーセンタイルまで求めるため100分割する
+    if frames > 1:
+        quantiles = statistics.quantiles(times, n=100, method="inclusive")
+    else:
+        quantiles = times * 99
+    return BenchResult(
+        name,
+        frames,
+        quantiles[49],
+        quantiles[89],
+        quantiles[98],
+        max(times),
+        allocated / 1024 / frames,
+        peak / 1024,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=100, help="画面ごとの描画回数")
+    parser.add_argument(
+        "--max-p99", type=float, help="描画時間の99パーセンタイルの上限(ミリ秒)、超えると失敗にする"
+    )
+    args = parser.parse_args()
+
+    draw = StateDraw(headless=True)
+    if draw.font_path is None:
+        print(
+            "日本語を描画できるフォントが見つかりません"
+            "(環境変数TYPING_GAME_FONTでフォントのファイルを指定できます)",
+            file=sys.stderr,
+        )
+        return 1
+    question = QuestionResponse("スクリ○ト", "台本、脚本、原稿などの意味を持つ英単語。")
+    judge = JudgeResponse(True, "")
+
+    def play(i):
+        """出題、解答の入力、判定までを1回とする"""
+        post_answer("script")
+        play = draw.play("ボキャブラリーゲーム: かんたん", "{}/3".format(i % 3))
+        next(play)
+        play.send(question)
+        try:
+            play.send(judge)
+        except StopIteration:
+            pass
+
+    def text_box(i):
+        """1文字入力されたときの描画"""
+        draw.text_box("script"[: i % 7] + "|")
+        draw.update()
+
+    screens = [
+        ("title", lambda i: draw.title(i % 2)),
+        ("choose_mode", lambda i: draw.choose_mode(["かんたん", "ふつう", "むずかしい"], i % 3)),
+        ("play", play),
+        ("text_box", text_box),
+        ("result", lambda i: draw.result(["ユーザー名: user", "正解数: 3", "不正解数: 0", "評価: S"])),
+    ]
+    print(
+        "{:<12}{:>7}{:>9}{:>9}{:>9}{:>9}{:>11}{:>10}".format(
+            "screen", "frames", "p50(ms)", "p90(ms)", "p99(ms)", "max(ms)", "alloc(KiB)", "peak(KiB)"
+        )
+    )
+    results = []
+    for name, frame in screens:
+        draw.current_screen = None  # 前の画面の描画を引き継がない
+        results.append(bench(name, frame, args.frames))
+        print(results[-1])
+    cache = draw.text_cache.info
+    print("text cache hit rate: {:.1%}".format(cache.hit_rate))
+    pygame.quit()
+    if args.max_p99 is not None:
+        slow = [x.name for x in results if x.p99 > args.max_p99]
+        if slow:
+            print(
+                "描画時間の99パーセンタイルが{}ミリ秒を超えました: {}".format(
+                    args.max_p99, ", ".join(slow)
+                ),
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,18 @@
-import csv
+import math
 import os
+import time
 from abc import ABCMeta, abstractmethod
+from array import array
+from concurrent.futures import Future
 from enum import Enum
 from random import randrange
-from typing import Dict, List, NamedTuple, Type, Union
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Type, Union
 
 from .shiritori_client import ShiritoriClient
+from .prevalidator import PreValidator
+from .sampler import Sampler, ShuffleSampler
+from .shiritori_local import get_client
+from .word_bank import WordBank, registry
 
 
 class Mode(NamedTuple):
@@ -32,6 +39,14 @@ class ShiritoriType(Enum):
     ADJECTIVE = Mode(2, "形容詞", 3)
 
 
+def percentile(values: Sequence[float], p: float) -> float:
+    """valuesのpパーセンタイル(最近接順位法)を返す関数、空なら0を返す"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
 class Score:
     """
     ゲームクリア時のスコアに関するクラス
@@ -44,6 +59,11 @@ class Score:
         self.__number_of_corrects = 0  # 正解した問題数
         self.__number_of_incorrects = 0  # 不正解だった問題数
         self.__grade = "-"  # 5段階評価の成績(S, A, B, C, D)
+        # 解答ごとの時間(秒)と打鍵速度(回/秒)、単精度の配列に詰めて持つ
+        self.__first_key_times = array("f")  # 出題から最初のキー入力まで
+        self.__submit_times = array("f")  # 出題から解答まで
+        self.__keystrokes_per_second = array("f")  # 打鍵速度
+        self.__judge_latencies = array("f")  # 正誤判定(しりとりならサーバとの通信)にかかった時間
 
     @property
     def type(self) -> Union[Type[ReportType], Type[ShiritoriType]]:
@@ -84,6 +104,42 @@ class Score:
     def grade(self) -> str:
         return self.__grade
 
+    @property
+    def first_key_times(self) -> Sequence[float]:
+        """解答ごとの、出題から最初のキー入力までの時間(秒)を返すプロパティ"""
+        return self.__first_key_times
+
+    @property
+    def submit_times(self) -> Sequence[float]:
+        """解答ごとの、出題から解答までの時間(秒)を返すプロパティ"""
+        return self.__submit_times
+
+    @property
+    def keystrokes_per_second(self) -> Sequence[float]:
+        """解答ごとの打鍵速度(回/秒)を返すプロパティ"""
+        return self.__keystrokes_per_second
+
+    @property
+    def judge_latencies(self) -> Sequence[float]:
+        """解答ごとの、正誤判定にかかった時間(秒)を返すプロパティ"""
+        return self.__judge_latencies
+
+    def add_timing(self, first_key: float, submit: float, keystrokes: int) -> None:
+        """
+        1回の解答の入力にかかった時間を追加するメソッド
+        打鍵速度は、最初のキー入力から解答までのキー入力の回数から求める
+        """
+        self.__first_key_times.append(first_key)
+        self.__submit_times.append(submit)
+        typing_time = submit - first_key
+        self.__keystrokes_per_second.append(
+            keystrokes / typing_time if typing_time > 0 else 0.0
+        )
+
+    def add_judge_latency(self, latency: float) -> None:
+        """1回の正誤判定にかかった時間を追加するメソッド"""
+        self.__judge_latencies.append(latency)
+
     def set_grade(self) -> None:
         """
         成績は、
@@ -135,6 +191,8 @@ class AGame(metaclass=ABCMeta):
     ReportもしくはShiritoriのインスタンス化し、set_modeで難易度(品詞)をセット
     その後、get_word()、judge_word(入力文字)、is_finishをサイクルする
     is_finishがTrueの場合リザルト画面に遷移させる
+    描画を止めたくない場合は、get_word_async()、judge_word_async(入力文字)で
+    Futureを受け取り、処理が終わるまでポーリングする
     """
 
     def __init__(self, game_type: Union[Type[ReportType], Type[ShiritoriType]]):
@@ -159,6 +217,26 @@ class AGame(metaclass=ABCMeta):
         """
         raise NotImplementedError()
 
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        fn(*args)の結果を持つFutureを返すメソッド
+        通信などで時間がかかるサブクラスは、これをオーバーライドして非同期にする
+        """
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    def get_word_async(self) -> Future:
+        """get_wordの結果をFutureで返すメソッド"""
+        return self.submit(self.get_word)
+
+    def judge_word_async(self, word: str) -> Future:
+        """judge_wordの結果をFutureで返すメソッド"""
+        return self.submit(self.judge_word, word)
+
     def get_mode(self) -> List[Mode]:
         """
         セットされたゲームのタイプのModeを返すメソッド
@@ -180,14 +258,29 @@ class AGame(metaclass=ABCMeta):
 
 
 class Shiritori(AGame):
-    def __init__(self) -> None:
+    def __init__(self, client: Optional[ShiritoriClient] = None) -> None:
+        """
+        clientで判定に使うクライアントを差し替えられる
+        指定しなければ、MeCabが使えれば同じプロセス内で判定し、使えなければサーバに問い合わせる
+        (指定しないときのクライアントは、すべてのしりとりゲームで共有する)
+        """
         super().__init__(ShiritoriType)
-        self.client = ShiritoriClient()  # サーバとやりとりをするためのクラスインスタンス
+        # 判定をするためのクラスインスタンス
+        self.client = client if client is not None else get_client()
         self.head_word = ""  # 頭文字に使う変数
+        # ゲーム開始時の頭文字は、メニュー画面を操作している間に裏で取得しておく
+        # (サーバとの接続もこのときに張られる)
+        self.head_word_future = self.client.submit(self.client.get_head_word)
+        # 明らかに不正解な解答をサーバに送らないためのクラスインスタンス
+        self.prevalidator = PreValidator()
 
     def __str__(self):
         return "しりとりゲーム: " + self.score.mode.value
 
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """サーバとの通信を待たないように、クライアントのスレッドでfn(*args)を実行する"""
+        return self.client.submit(fn, *args)
+
     def set_mode(self, game_mode: Mode) -> None:
         """しりとりゲームの品詞を設定する具象メソッド"""
         self.score.mode = game_mode
@@ -196,9 +289,12 @@ class Shiritori(AGame):
     def get_word(self) -> QuestionResponse:
         """出題する問題を返す具象メソッド"""
         # ゲーム開始時は頭文字が設定されてないので、
-        # クライアントを通して取得する
+        # インスタンス化時に取得を始めたものを使う(失敗していれば取得しなおす)
         if not self.head_word:
-            head = self.client.get_head_word()
+            try:
+                head = self.head_word_future.result()
+            except Exception:
+                head = self.client.get_head_word()
             self.head_word = head["next_head"]
         # 上でhead_wordがNoneでないことが保証される
         description = "「{}」で始まる{}を入力してください".format(
@@ -214,9 +310,16 @@ class Shiritori(AGame):
         """
         if self.head_word is None:
             raise Exception("頭文字が設定されていません")
+        # 手元で不正解と分かるものは、サーバに問い合わせずに不正解にする
+        plausible, message = self.prevalidator.validate(word, self.head_word)
+        if not plausible:
+            self.score.number_of_incorrects += 1
+            return JudgeResponse(False, message)
+        started = time.perf_counter()
         result = self.client.shiritori(word, self.head_word)
+        self.score.add_judge_latency(time.perf_counter() - started)
         correct = result["is_correct"]  # 正誤の判定結果
-        # 言葉の尻が「ん」であったとき
+        # 言葉の尻が「ん」であったとき(漢字で終わる単語は手元で判定できない)
         if result["next_head"] == "ん":
             correct = False
             result["message"] = "最後が「ん」になっています"
@@ -235,10 +338,17 @@ class Shiritori(AGame):
 
 
 class Report(AGame):
-    def __init__(self) -> None:
+    def __init__(self, sampler_type: Type[Sampler] = ShuffleSampler) -> None:
+        """
+        sampler_typeで出題する単語の選び方を指定できる
+        RandomSampler: 毎回ランダム、ShuffleSampler: 重複なし、
+        WeightedSampler: 不正解の多い単語ほど出やすい
+        """
         super().__init__(ReportType)
-        self.words: List[Dict[str, str]] = []  # 出題する問題を格納するリスト
+        self.words: List[Dict[str, Any]] = []  # 出題する問題を格納するリスト
         self.file_path = os.path.dirname(__file__) + "/words.csv"
+        self.sampler_type = sampler_type
+        self.sampler: Optional[Sampler] = None  # 単語帳の行数がわかってから生成する
 
     def __str__(self):
         return "ボキャブラリーゲーム: " + self.score.mode.value
@@ -256,19 +366,25 @@ class Report(AGame):
         """
         set_mode時や、不正解時にself.wordsに単語を追加するメソッド
         """
-        with open(self.file_path, mode="r", encoding="shift_jis") as f:
-            reader = csv.reader(f)
-            rows = [row for row in reader]  # 行をリストに格納していく
-            len_rows = len(rows)  # csvの行数
-            for i in range(number_of_words):  # 出題する問題数分だけループ
-                line_number = randrange(len_rows)  # 行数分のうちランダムに数値を取る
-                word = rows[line_number]
-                dict_word = {
-                    "question": word[0],
-                    "answer": word[1],
-                    "description": word[2],
-                }
-                self.words.append(dict_word)
+        bank = self.bank
+        len_rows = len(bank)  # 単語帳の行数
+        # 単語帳が開きなおされて行数が変わったときは、選び方を作りなおす
+        if self.sampler is None or self.sampler.n != len_rows:
+            # これまでのゲームでの不正解数も渡す(WeightedSamplerの重みに使われる)
+            self.sampler = self.sampler_type(len_rows, registry.misses(self.file_path))
+        for i in range(number_of_words):  # 出題する問題数分だけループ
+            line_number = self.sampler.sample()  # 行数分のうちから数値を選ぶ
+            dict_word = bank[line_number]._asdict()
+            dict_word["line_number"] = line_number  # 不正解を記録するために行番号も持つ
+            self.words.append(dict_word)
+
+    @property
+    def bank(self) -> WordBank:
+        """
+        csvをコンパイルした単語帳を返すプロパティ
+        単語帳はすべてのReportで共有され、最初に使われたときに開かれる
+        """
+        return registry.get(self.file_path)
 
     def hole(self, word: List[str]) -> str:
         """
@@ -299,6 +415,9 @@ class Report(AGame):
             self.score.number_of_corrects += 1  # 正解数を更新する
         else:  # 不正解の時
             self.score.number_of_incorrects += 1  # 不正解数を更新する
+            # 単語ごとの不正解を、このゲームの選び方とプロセス全体の両方に記録する
+            self.sampler.miss(q_word["line_number"])
+            registry.miss(self.file_path, q_word["line_number"])
             self.add_words(1)  # 1単語追加する
             message = "正解は{}です".format(q_word["answer"])
         return JudgeResponse(correct, message)
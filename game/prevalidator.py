@@ -0,0 +1,107 @@
+"""
+しりとりの解答を、サーバに問い合わせる前に手元で判定するためのモジュール
+サーバで判定しても必ず不正解になるもの(空、日本語なし、頭文字違い、「ん」で終わる)だけを弾き、
+漢字などで読みが分からないものはサーバに任せる
+かなの変換はサーバのKataHira(依存するモジュールがないので、MeCabがなくてもimportできる)を使う
+"""
+
+
+from typing import Tuple
+
+from .shiritori_server.katahira import KataHira
+
+# MeCabのよみでは別の文字になりうる頭文字(ゑびす => エビス、ヴァイオリン => バイオリン、
+# づつみ => ツツミ、ヶ月 => カゲツ等)、これらで始まるときは頭文字を判定せずにサーバに任せる
+UNCERTAIN_HEADS = frozenset("ゐゑゔぢづゕゖヰヱヴヂヅヵヶ")
+
+
+def is_hiragana(c: str) -> bool:
+    return "ぁ" <= c <= "ゖ"
+
+
+def is_katakana(c: str) -> bool:
+    return "ァ" <= c <= "ヶ"
+
+
+def is_kana(c: str) -> bool:
+    return is_hiragana(c) or is_katakana(c)
+
+
+def is_lower_kana(c: str) -> bool:
+    """小文字のかな(ぁ、ッ等)かを判定する関数"""
+    code = ord(c) - KataHira.kata_hira_diff if is_katakana(c) else ord(c)
+    return code in KataHira.lower_hiragana_list
+
+
+def to_hiragana(c: str) -> str:
+    """
+    かな1文字を、サーバが頭文字に使うひらがなにする関数
+    サーバのKataHira.normalizeと同じく、小文字は大文字にする(例: ァ => あ)
+    """
+    return c.translate(KataHira.table)
+
+
+class PreValidator:
+    """
+    しりとりの解答がサーバで正解になりうるかを判定するクラス
+    サーバのShiritori.judgeと同じメッセージを返す
+    """
+
+    def validate(self, word: str, head_word: str) -> Tuple[bool, str]:
+        """
+        wordがhead_wordから始まる正解になりうるかを判定するメソッド
+        なりえないときは(False, 理由)、なりうるときは(True, "")を返す
+        """
+        word = word.strip()
+        judge = self.judge_not_empty(word)
+        if judge[0]:
+            judge = self.judge_japanese(word)
+        if judge[0]:
+            judge = self.judge_correct_head(head_word, word)
+        if judge[0]:
+            judge = self.judge_not_end_with_n(word)
+        return judge
+
+    def judge_not_empty(self, word: str) -> Tuple[bool, str]:
+        """空でないことの判定メソッド(1文字のかなも読みが1字なので弾く)"""
+        if not word or (len(word) == 1 and is_kana(word)):
+            return (False, "一字以上のよみを入力してください。")
+        return (True, "")
+
+    def judge_japanese(self, word: str) -> Tuple[bool, str]:
+        """
+        日本語が含まれていることの判定メソッド
+        ASCIIと半角カナだけのものはMeCabで読みが付かない
+        """
+        if all(c <= "\x7f" or "｡" <= c <= "ﾟ" for c in word):
+            return (False, "日本語以外が含まれている可能性があります。")
+        return (True, "")
+
+    def judge_correct_head(self, correct_head: str, word: str) -> Tuple[bool, str]:
+        """
+        かなで始まる単語が、指定された言葉から始まっているかの判定メソッド
+        頭文字のよみが確かなときだけ判定し、漢字などで始まるときや、
+        小文字で始まるとき(MeCabが記号とみなす)、UNCERTAIN_HEADSで始まるときはサーバに任せる
+        """
+        c = word[0]
+        if not is_kana(c) or is_lower_kana(c) or c in UNCERTAIN_HEADS:
+            return (True, "")
+        hiragana_word = to_hiragana(c)
+        if hiragana_word == correct_head:
+            return (True, "")
+        return (
+            False,
+            "頭文字は「{}」と判定されました。"
+            "「{}」から始まる単語ではないようです。".format(hiragana_word, correct_head),
+        )
+
+    def judge_not_end_with_n(self, word: str) -> Tuple[bool, str]:
+        """
+        かなで終わる単語が「ん」で終わっていないことの判定メソッド
+        サーバと同じく、最後の長音符(ー)は1つだけ読み飛ばす
+        """
+        if word[-1] == "ー":
+            word = word[:-1]
+        if word and is_kana(word[-1]) and to_hiragana(word[-1]) == "ん":
+            return (False, "最後が「ん」になっています")
+        return (True, "")
@@ -0,0 +1,136 @@
+"""
+ボキャブラリーゲームで出題する単語(の行番号)を選ぶためのモジュール
+Reportのadd_wordsから使われる
+"""
+
+
+from abc import ABCMeta, abstractmethod
+from random import randrange
+from typing import Dict, List, Optional, Type
+
+
+class Sampler(metaclass=ABCMeta):
+    """
+    0からn-1までの行番号から出題するものを選ぶ抽象クラス
+    """
+
+    def __init__(self, n: int, misses: Optional[Dict[int, int]] = None) -> None:
+        """
+        n: 行数
+        misses: これまでのゲームでの{行番号: 不正解数}の辞書(WeightedSamplerだけが使う)
+        """
+        self.n = n  # 行数
+
+    @abstractmethod
+    def sample(self) -> int:
+        """出題する行番号を1つ選ぶ抽象メソッド"""
+        raise NotImplementedError()
+
+    def miss(self, i: int) -> None:
+        """i行目の単語が不正解だったことを知らせるメソッド"""
+        pass
+
+
+class RandomSampler(Sampler):
+    """毎回独立にランダムに選ぶクラス(重複あり)"""
+
+    def sample(self) -> int:
+        return randrange(self.n)
+
+
+class ShuffleSampler(Sampler):
+    """
+    すべての行を出題し終えるまで重複なく選ぶクラス
+    フィッシャー-イェーツのシャッフルを1つずつ進めるので、k問選ぶのにO(k)しかかからない
+    並べ替えた位置だけを辞書に持つので、行数分のリストも作らない
+    """
+
+    def __init__(self, n: int, misses: Optional[Dict[int, int]] = None) -> None:
+        super().__init__(n, misses)
+        self.__remaining = n  # まだ選ばれていない行数
+        self.__swapped: Dict[int, int] = {}  # 位置と、そこに入れ替えられた行番号の辞書
+
+    def sample(self) -> int:
+        if self.__remaining == 0:  # 一巡したら最初からやり直す
+            self.__remaining = self.n
+            self.__swapped.clear()
+        j = randrange(self.__remaining)
+        last = self.__remaining - 1
+        picked = self.__swapped.get(j, j)
+        # 選んだ位置に末尾の行番号を入れ、末尾を切り詰める
+        last_value = self.__swapped.pop(last, last)
+        if j != last:
+            self.__swapped[j] = last_value
+        self.__remaining -= 1
+        return picked
+
+
+class FenwickTree:
+    """
+    重みの更新と累積和の探索をO(log n)で行うための木(Binary Indexed Tree)
+    """
+
+    def __init__(self, weights: List[int]) -> None:
+        self.n = len(weights)
+        self.__tree = [0] + list(weights)  # 1始まりで扱う
+        for i in range(1, self.n + 1):  # O(n)で構築する
+            j = i + (i & -i)
+            if j <= self.n:
+                self.__tree[j] += self.__tree[i]
+        self.total = sum(weights)  # 重みの合計
+
+    def add(self, i: int, delta: int) -> None:
+        """i番目の重みにdeltaを足すメソッド"""
+        self.total += delta
+        i += 1
+        while i <= self.n:
+            self.__tree[i] += delta
+            i += i & -i
+
+    def find(self, x: int) -> int:
+        """
+        累積和がxを超える最初の位置を返すメソッド
+        0 <= x < totalであること
+        """
+        pos = 0
+        step = 1 << self.n.bit_length()
+        while step:
+            if pos + step <= self.n and self.__tree[pos + step] <= x:
+                pos += step
+                x -= self.__tree[pos]
+            step >>= 1
+        return pos
+
+
+class WeightedSampler(Sampler):
+    """
+    不正解が多い単語ほど選ばれやすくするクラス(重複あり)
+    重みは 1 + miss_weight * その単語の不正解数(これまでのゲームの分も含む)
+    重みの更新、選択ともにO(log n)
+    """
+
+    miss_weight = 2  # 1回の不正解で増える重み
+
+    def __init__(self, n: int, misses: Optional[Dict[int, int]] = None) -> None:
+        super().__init__(n, misses)
+        # 行番号と不正解数の辞書
+        self.misses: Dict[int, int] = {i: x for i, x in (misses or {}).items() if i < n}
+        weights = [1] * n
+        for i, x in self.misses.items():
+            weights[i] += WeightedSampler.miss_weight * x
+        self.__tree = FenwickTree(weights)
+
+    def sample(self) -> int:
+        return self.__tree.find(randrange(self.__tree.total))
+
+    def miss(self, i: int) -> None:
+        self.misses[i] = self.misses.get(i, 0) + 1
+        self.__tree.add(i, WeightedSampler.miss_weight)
+
+
+# typing_game.pyの--samplerで指定できる選び方
+SAMPLERS: Dict[str, Type[Sampler]] = {
+    "shuffle": ShuffleSampler,
+    "random": RandomSampler,
+    "weighted": WeightedSampler,
+}
@@ -1,30 +1,171 @@
 import json
-from typing import Any, Dict, Optional
-from urllib.error import HTTPError, URLError
-from urllib.parse import urlencode
-from urllib.request import urlopen
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.client import (
+    HTTPConnection,
+    HTTPException,
+    HTTPSConnection,
+    RemoteDisconnected,
+)
+from threading import Lock
+from time import sleep, time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
 
 
 class ShiritoriClient:
     # host = "http://127.0.0.1:8000"
     host = "https://game-pbl-shiritori.df.r.appspot.com"
+    timeout = 5.0  # 1回のリクエストのタイムアウト(秒)
+    retries = 3  # 通信に失敗したときに試行する回数
+    backoff = 0.5  # 再試行までの待ち時間(秒)、試行ごとに倍にする
+    # 使い回した接続が、待っている間にサーバ側で閉じられていたときの例外
+    stale_errors = (RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+    # 品詞の一覧を保存しておくファイル
+    modes_cache = os.path.join(
+        os.path.expanduser("~"), ".cache", "typing_game", "shiritori_modes.json"
+    )
 
     def __init__(self) -> None:
         self.mode = 0
         self.host = ShiritoriClient.host + "/shiritori/"
-        self.modes = None # self.request(self.host + "modes/")
+        self.modes: Optional[Dict[str, str]] = None  # 品詞の一覧(取得できるまではNone)
+        self.__connection: Optional[HTTPConnection] = None  # 使い回す接続
+        self.__lock = Lock()  # 接続は複数スレッドから同時に使えないので排他する
+        # 描画を止めないように、リクエストを裏で順番に処理するためのスレッド
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+        self.load_modes()
+
+    def connection(self) -> HTTPConnection:
+        """
+        サーバとの接続を返すメソッド
+        接続済みであればそれを使い回す(TLSのハンドシェイクを毎回しないため)
+        """
+        if self.__connection is None:
+            url = urlsplit(self.host)
+            if url.scheme == "https":
+                self.__connection = HTTPSConnection(url.netloc, timeout=self.timeout)
+            else:
+                self.__connection = HTTPConnection(url.netloc, timeout=self.timeout)
+        return self.__connection
+
+    def close(self) -> None:
+        """サーバとの接続を閉じるメソッド"""
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        サーバにリクエストし、ステータスコード、ヘッダ(キーは小文字)、本文を返すメソッド
+        失敗したときは接続を張り直し、待ち時間を伸ばしながら再試行する
+        使い回した接続がサーバ側で閉じられていただけのときは、待たずにすぐ張り直す
+        """
+        url_parts = urlsplit(url)
+        path = url_parts.path + ("?" + url_parts.query if url_parts.query else "")
+        with self.__lock:
+            i = 0  # 失敗した回数
+            while True:
+                reused = self.__connection is not None  # 前のリクエストの接続を使うか
+                try:
+                    connection = self.connection()
+                    connection.request("GET", path, headers=headers or {})
+                    response = connection.getresponse()
+                    body = response.read()  # 接続を使い回すために必ず読み切る
+                    if response.status < 500:
+                        break
+                except (HTTPException, OSError) as e:  # タイムアウトもOSErrorに含まれる
+                    if reused and isinstance(e, self.stale_errors):
+                        # (uvicorn等はしばらく使われない接続を閉じる)
+                        self.close()
+                        continue
+                self.close()  # 接続を張り直す
+                i += 1
+                if i >= self.retries:
+                    raise Exception("通信に失敗しました")
+                sleep(self.backoff * 2 ** (i - 1))
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, body
 
     def request(self, url: str) -> Any:
         """
-        urllibを使ってサーバにリクエストするメソッド
+        サーバにリクエストするメソッド
         辞書型にして返す
         """
-        result = None
-        try:
-            with urlopen(url) as response:
-                return json.load(response)
-        except (HTTPError, URLError) as error:
+        status, _, body = self.fetch(url)
+        if status != 200:
             raise Exception("通信に失敗しました")
+        return json.loads(body)
+
+    def load_modes(self) -> None:
+        """
+        品詞の一覧を読み込むメソッド
+        保存しておいたものがあればそれを使い、有効期限が切れていれば裏でサーバに確かめる
+        """
+        cache = self.read_modes_cache()
+        if cache is not None:
+            self.modes = cache["modes"]
+        if cache is None or cache["expires"] <= time():
+            self.submit(self.revalidate_modes, cache)
+
+    def read_modes_cache(self) -> Optional[Dict[str, Any]]:
+        """保存しておいた品詞の一覧を読み込むメソッド、なければNoneを返す"""
+        try:
+            with open(self.modes_cache, mode="r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache if {"modes", "etag", "expires"} <= cache.keys() else None
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def revalidate_modes(self, cache: Optional[Dict[str, Any]]) -> None:
+        """
+        サーバから品詞の一覧を取得して保存するメソッド
+        保存しておいたものがあればETagを送り、変わっていなければ本文を受け取らずに済ませる
+        通信に失敗したときは、保存しておいたものをそのまま使う
+        """
+        headers = {"If-None-Match": cache["etag"]} if cache and cache["etag"] else {}
+        try:
+            status, response_headers, body = self.fetch(self.host + "modes/", headers)
+        except Exception:
+            return
+        if status == 304 and cache is not None:
+            modes = cache["modes"]
+        elif status == 200:
+            modes = json.loads(body)
+        else:
+            return
+        max_age = re.search(r"max-age=(\d+)", response_headers.get("cache-control", ""))
+        self.modes = modes
+        self.write_modes_cache(
+            {
+                "modes": modes,
+                "etag": response_headers.get("etag", ""),
+                "expires": time() + (int(max_age.group(1)) if max_age else 0),
+            }
+        )
+
+    def write_modes_cache(self, cache: Dict[str, Any]) -> None:
+        """
+        品詞の一覧を保存するメソッド
+        書き込み中のファイルを読まれないように、一時ファイルに書いてから置き換える
+        """
+        try:
+            os.makedirs(os.path.dirname(self.modes_cache), exist_ok=True)
+            tmp_path = self.modes_cache + ".tmp"
+            with open(tmp_path, mode="w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.modes_cache)
+        except OSError:
+            pass  # 保存できなくても、次回また取得すればよい
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        fn(*args)を裏のスレッドで実行するメソッド
+        結果はFutureで受け取るので、呼び出し側は待っている間も描画を続けられる
+        """
+        return self.__executor.submit(fn, *args)
 
     def set_mode(self, mode: int) -> bool:
         """
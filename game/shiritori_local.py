@@ -0,0 +1,129 @@
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+from threading import Lock
+from types import ModuleType
+from typing import Any, Optional
+
+from .shiritori_client import ShiritoriClient
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "shiritori_server"
+)
+# サーバ側のshiritoriモジュールと、それがshiritori_serverディレクトリ直下からimportするモジュール
+SERVER_MODULES = [
+    "shiritori",
+    "cache",
+    "katahira",
+    "metrics",
+    "reading_index",
+    "session",
+    "tagger_pool",
+]
+# サーバ側のrequirements.txtのうち、判定に使うパッケージ
+SERVER_REQUIREMENTS = ["MeCab", "pydantic"]
+server_import_lock = Lock()  # import中だけパスを変えるので、同時にimportしないように排他する
+
+
+def import_server() -> ModuleType:
+    """
+    サーバ側のshiritoriモジュールをimportして返す関数
+    サーバ側のモジュールはshiritori_serverディレクトリ直下から(cache等の名前で)importされる前提なので、
+    import中だけパスの先頭に通し、インストールされた同じ名前のモジュールが使われないようにする
+    必要なパッケージがない、もしくは同じ名前の別のモジュールがimport済みであれば、
+    理由を書いたImportErrorを送出する
+    """
+    missing = [x for x in SERVER_REQUIREMENTS if importlib.util.find_spec(x) is None]
+    if missing:
+        raise ImportError(
+            "ローカルでの判定には{}のインストールが必要です".format(", ".join(missing))
+        )
+    for name in SERVER_MODULES:
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        path = getattr(module, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(path)) != SERVER_DIR:
+            raise ImportError(
+                "サーバ側のモジュール{}と同じ名前の別のモジュールがimportされています".format(name)
+            )
+    with server_import_lock:
+        sys.path.insert(0, SERVER_DIR)
+        try:
+            return importlib.import_module("shiritori")
+        finally:
+            sys.path.remove(SERVER_DIR)  # 先頭に通したものを外す
+
+
+class LocalShiritoriClient(ShiritoriClient):
+    """
+    サーバを経由せず、サーバ側のShiritoriクラスを同じプロセス内で直接呼ぶクライアント
+    MeCab等がインストールされていない環境ではインスタンス化時にImportErrorになり、
+    辞書がない環境ではRuntimeErrorになる
+    """
+
+    def __init__(self) -> None:
+        server = import_server()
+        self.judge = server.Shiritori()  # サーバ側の判定クラス
+        self.word_classes = [i.value for i in server.Mode]
+        super().__init__()
+
+    def load_modes(self) -> None:
+        """品詞の一覧はサーバに問い合わせずに、サーバ側の定義から作る"""
+        # サーバの/shiritori/modes/と同じく、キーは文字列にしておく
+        self.modes = {str(k): v for k, v in self.word_classes}
+
+    def get_head_word(self) -> Any:
+        """
+        最初の出題で使われるメソッド
+        ランダムなひらがなの頭文字を生成する
+        """
+        return self.judge.make_initial_word()._asdict()
+
+    def shiritori(self, word: str, head_word: str) -> Any:
+        """形態素解析をして判定するメソッド"""
+        if head_word is None or len(head_word) != 1:
+            raise Exception("一文字の頭文字が設定できていません")
+        mode_word_class = self.word_classes[self.mode].class_name
+        return self.judge.is_correct_word(mode_word_class, word, head_word)._asdict()
+
+
+def make_client() -> ShiritoriClient:
+    """
+    環境変数SHIRITORI_BACKENDに応じて、しりとりの判定に使うクライアントを返す関数
+    local: LocalShiritoriClient
+    http: ShiritoriClient
+    auto(未設定時): MeCabが使えればLocalShiritoriClient、使えなければShiritoriClient
+    (MeCabがない、もしくは辞書が見つからずMeCab.Taggerを作れないときは使えない)
+    """
+    backend = os.environ.get("SHIRITORI_BACKEND", "auto")
+    if backend == "http":
+        return ShiritoriClient()
+    try:
+        return LocalShiritoriClient()
+    except (ImportError, RuntimeError) as e:
+        if backend == "local":
+            raise
+        logger.warning("ローカルで判定できないので、サーバに問い合わせます: %s", e)
+        return ShiritoriClient()
+
+
+shared_client: Optional[ShiritoriClient] = None  # get_clientで共有するクライアント
+shared_client_lock = Lock()  # クライアントを2つ作らないように排他する
+
+
+def get_client() -> ShiritoriClient:
+    """
+    make_clientで作ったクライアントを、プロセス全体で共有して返す関数
+    最初に呼ばれたときだけ作るので、しりとりゲームを選びなおすたびに
+    MeCab.Taggerの作成やサーバとの接続をやりなおさない
+    """
+    global shared_client
+    with shared_client_lock:
+        if shared_client is None:
+            shared_client = make_client()
+        return shared_client
@@ -0,0 +1,61 @@
+"""
+判定結果のレスポンスを作ってJSONにするまでの時間を、
+pydanticのResponseを使う方法と、Judgementを直接JSONにする方法で比べるスクリプト
+
+    $ python bench_response.py [回数]
+"""
+
+
+import sys
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import _prepare_response_content
+from fastapi.utils import create_response_field
+from shiritori import Judgement, Response
+
+# response_modelを指定したハンドラがResponseを返したときに、FastAPIが検証に使うもの
+RESPONSE_FIELD = create_response_field(name="Response", type_=Response)
+ARGUMENTS = ("りんご", "名詞", True, "", "ご")
+
+
+def with_model() -> bytes:
+    """Responseを作って値を代入し、FastAPIと同じ手順でJSONにする"""
+    response = Response(
+        word=ARGUMENTS[0],
+        word_class=ARGUMENTS[1],
+        is_correct=False,
+        message="",
+        next_head="り",
+    )
+    response.is_correct = ARGUMENTS[2]
+    response.message = ARGUMENTS[3]
+    response.next_head = ARGUMENTS[4]
+    # fastapi.routing.serialize_responseと同じ処理を、スレッドプールを使わずに行う
+    content = _prepare_response_content(
+        response, exclude_unset=False, exclude_defaults=False, exclude_none=False
+    )
+    value, errors = RESPONSE_FIELD.validate(content, {}, loc=("response",))
+    assert not errors
+    return JSONResponse(jsonable_encoder(value)).body
+
+
+def with_tuple() -> bytes:
+    """Judgementを作って直接JSONにする"""
+    return Judgement(*ARGUMENTS).to_json()
+
+
+def main(number: int) -> None:
+    # 両方が同じJSONになることを確かめてから計測する
+    assert with_model() == with_tuple(), (with_model(), with_tuple())
+    results = {}
+    for function in (with_model, with_tuple):
+        seconds = min(timeit.repeat(function, number=number, repeat=5))
+        results[function.__name__] = seconds / number * 1e6
+        print("{}: {:.2f}µs/回".format(function.__name__, results[function.__name__]))
+    print("{:.1f}倍".format(results["with_model"] / results["with_tuple"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
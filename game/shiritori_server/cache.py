@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Generic, Hashable, NamedTuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheInfo(NamedTuple):
+    """キャッシュの統計情報を格納する名前付きタプル"""
+
+    hits: int  # キャッシュにあった回数
+    misses: int  # キャッシュになかった回数
+    evictions: int  # 上限を超えたため追い出した回数
+    size: int  # 現在のキャッシュ数
+    maxsize: int  # キャッシュ数の上限
+
+
+class LRUCache(Generic[K, V]):
+    """
+    最も長く使われていないものから追い出す、上限付きのキャッシュ
+    maxsizeが0以下であればキャッシュしない
+    複数のスレッドから使えるように、辞書の操作は排他する(値の生成は排他しない)
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.__data: "OrderedDict[K, V]" = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+    def get_or_set(self, key: K, factory: Callable[[K], V]) -> V:
+        """
+        keyに対応する値を返すメソッド
+        キャッシュになければfactory(key)で生成して格納する
+        """
+        with self.__lock:
+            if key in self.__data:
+                self.__hits += 1
+                self.__data.move_to_end(key)  # 最近使われたものとして末尾に移動する
+                return self.__data[key]
+            self.__misses += 1
+        value = factory(key)
+        if self.maxsize > 0:
+            with self.__lock:
+                self.__data[key] = value
+                if len(self.__data) > self.maxsize:
+                    self.__data.popitem(last=False)  # 最も古いものを追い出す
+                    self.__evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """キャッシュと統計情報を空にするメソッド"""
+        with self.__lock:
+            self.__data.clear()
+            self.__hits = self.__misses = self.__evictions = 0
+
+    @property
+    def info(self) -> CacheInfo:
+        """統計情報を返すプロパティ"""
+        return CacheInfo(
+            self.__hits, self.__misses, self.__evictions, len(self.__data), self.maxsize
+        )
@@ -1,4 +1,8 @@
 #!/bin/bash
+set -e
+cd "$(dirname "$0")"
 
+# 読みの索引(words.bin)を作成してからアップロードする(サーバは読み込むだけで、作成しない)
+python reading_index.py words.txt
 gcloud app deploy app.yaml
 # gcloud app logs tail
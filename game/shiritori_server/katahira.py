@@ -1,3 +1,20 @@
+from typing import Dict, Iterable, List
+
+
+def make_table(kata_hira_diff: int, lower_hiragana_list: List[int]) -> Dict[int, int]:
+    """
+    str.translateで使う、ユニコード値の変換表を作る関数
+    カタカナ(ァ~ヶ)はひらがなに、小文字(ひらがなの小文字も含む)は大文字にする
+    """
+    table = {}
+    for katakana in range(ord("ァ"), ord("ヶ") + 1):
+        hiragana = katakana - kata_hira_diff
+        table[katakana] = hiragana + 1 if hiragana in lower_hiragana_list else hiragana
+    for hiragana in lower_hiragana_list:
+        table[hiragana] = hiragana + 1
+    return table
+
+
 class KataHira:
     """	
     カタカナからひらがなへ変換するためのクラス	
@@ -18,12 +35,19 @@ class KataHira:
     ]
     # カタカナとひらがなのユニコード値の差分
     kata_hira_diff = 96
+    # 文字列をまとめて変換するための変換表(1文字ずつの計算や小文字の判定をしなくて済む)
+    table = make_table(kata_hira_diff, lower_hiragana_list)
+    # 単語の区切りに使う文字(読みに含まれない文字)
+    separator = "\0"
 
     def convert(self, katakana: str) -> str:
         """	
         カタカナの文字をひらがなに変換するメソッド	
         ただし、ひらがなにしたものが小文字であれば大文字(例: ぁ => あ)にする	
         """	
+        # カタカナであれば変換表から引く
+        if "ァ" <= katakana <= "ヶ":
+            return chr(KataHira.table[ord(katakana)])
         # 差分を引いてひらがなにする
         hiragana = ord(katakana) - KataHira.kata_hira_diff
         # ひらがなが文字か判定してから返す
@@ -40,3 +64,30 @@ class KataHira:
         if hiragana_ord in KataHira.lower_hiragana_list:
             return True
         return False
+
+    def normalize(self, reading: str) -> str:
+        """
+        読みの文字列をまとめてひらがなに変換するメソッド
+        カタカナと小文字はconvertと同じように変換し、それ以外の文字(長音符ー等)はそのまま残す
+        """
+        return reading.translate(KataHira.table)
+
+    def normalize_all(self, readings: Iterable[str]) -> List[str]:
+        """
+        複数の読みをまとめてひらがなに変換するメソッド
+        区切り文字でつないでから1回で変換するので、辞書の前処理などで大量に変換するときに使う
+        """
+        return self.normalize(KataHira.separator.join(readings)).split(KataHira.separator)
+
+    def head(self, reading: str) -> str:
+        """読みの頭文字をひらがなで返すメソッド"""
+        return self.normalize(reading[:1])
+
+    def tail(self, reading: str) -> str:
+        """
+        読みの最後の文字をひらがなで返すメソッド
+        最後が長音符(ー)のときは、その前の文字を返す(例: コーヒー => ひ)
+        """
+        if reading[-1:] == "ー":
+            reading = reading[:-1]
+        return self.normalize(reading[-1:])
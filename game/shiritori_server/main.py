@@ -1,48 +1,416 @@
-from typing import Optional
+import asyncio
+import gc
+import hashlib
+import logging
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from random import choice
+from threading import Thread
+from typing import Any, Iterable, List, NamedTuple, Optional
 
-from fastapi import FastAPI, Path
+from fastapi import FastAPI, HTTPException, Path, Request
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import RedirectResponse
-from shiritori import Mode, Response, Shiritori
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
+from fastapi.responses import Response as RawResponse
+from metrics import REQUEST_SECONDS, STAGE_SECONDS, registry
+from reading_index import ReadingIndex
+from shiritori import (
+    ChainRequest,
+    Difficulty,
+    JudgeRequest,
+    Judgement,
+    Mode,
+    OpponentRequest,
+    Response,
+    SessionJudgeRequest,
+    SessionOpponentRequest,
+    SessionRequest,
+    SessionResponse,
+    Shiritori,
+    WordGraph,
+    judgements_to_json,
+)
+from session import Session, SessionStore
+from warmup import Warmup, read_corpus
 
 app = FastAPI()
-shiritori = Shiritori()
+# 環境変数SHIRITORI_METRICSが1のときだけ処理時間等を計測し、/metricsで返す
+registry.enabled = os.environ.get("SHIRITORI_METRICS") == "1"
+# 判定を行うプロセス数(python main.pyで起動したとき)と、プロセスごとのスレッド数
+# 形態素解析器はスレッド数と同じだけ用意するので、リクエストが解析器を待つことはない
+workers = int(os.environ.get("SHIRITORI_WORKERS", 1))
+threads = int(
+    os.environ.get("SHIRITORI_THREADS", max(1, (os.cpu_count() or 1) // workers))
+)
+# 形態素解析結果のキャッシュ数は環境変数で変更できる
+shiritori = Shiritori(
+    int(os.environ.get("SHIRITORI_CACHE_SIZE", 1024)), taggers=threads
+)
 word_classes = [i.value for i in Mode]
+# セッションの有効期限(秒)と上限数も環境変数で変更できる
+sessions = SessionStore(
+    float(os.environ.get("SHIRITORI_SESSION_TTL", 1800)),
+    int(os.environ.get("SHIRITORI_MAX_SESSIONS", 50000)),
+)
+# 読みの索引の元になる単語の一覧も環境変数で変更できる
+# 索引はdeploy.shで作成しておき、ないか古ければ一時ディレクトリに作成する
+# 作成もできなければ索引を使わず、すべてMeCabで判定する
+words_path = os.environ.get(
+    "SHIRITORI_WORDS", os.path.join(os.path.dirname(__file__), "words.txt")
+)
+if os.path.exists(words_path):
+    try:
+        shiritori.index = ReadingIndex.open(words_path, shiritori.parse)
+        shiritori.graph = WordGraph(shiritori.index)
+    except OSError as e:
+        logging.getLogger(__name__).warning("読みの索引を使わずに起動します: %s", e)
+# 起動時の準備に使う単語の数も環境変数で変更できる
+warmup = Warmup(
+    shiritori,
+    read_corpus(words_path, int(os.environ.get("SHIRITORI_WARMUP_SIZE", 200)))
+    if os.path.exists(words_path)
+    else ["りんご", "走る", "赤い"],
+)
+# ウォームアップリクエストが準備を待つためだけのスレッド
+# (ハンドラ用のスレッドはthreads個しかないので、待っている間も他のリクエストを受けられるように分ける)
+warmup_executor = ThreadPoolExecutor(max_workers=1)
+
+
+class StaticBody(NamedTuple):
+    """
+    あらかじめJSONにしておいたレスポンスの本文と、そのETag
+    変わらない内容をリクエストのたびに作りなおさないために使う
+    """
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, content: Any) -> "StaticBody":
+        """contentを、FastAPIが返すものと同じ形式のJSONにするクラスメソッド"""
+        body = JSONResponse(jsonable_encoder(content)).body
+        return cls(body, '"{}"'.format(hashlib.sha1(body).hexdigest()[:16]))
+
+    def respond(self, request: Request, max_age: int) -> RawResponse:
+        """
+        本文を返すメソッド、クライアントが同じETagのものを持っていれば304を返す
+        max_age秒の間は問い合わせずに使ってよいことを、Cache-Controlで知らせる
+        """
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": "public, max-age={}".format(max_age),
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        etags = [x.strip().replace("W/", "", 1) for x in if_none_match.split(",")]
+        if self.etag in etags or if_none_match.strip() == "*":
+            return RawResponse(status_code=304, headers=headers)
+        return RawResponse(self.body, media_type="application/json", headers=headers)
+
+
+# 変わらないレスポンスはあらかじめJSONにしておく
+MODES_MAX_AGE = 86400  # 品詞の一覧を問い合わせずに使ってよい秒数
+modes_body = StaticBody.of(dict(word_classes))
+hello_body = StaticBody.of("Hello")
+# 頭文字はランダムだが、候補は限られているので全てJSONにしておく
+initial_word_bodies = [
+    StaticBody.of(x._asdict()).body for x in shiritori.make_initial_words()
+]
+
+
+@app.on_event("startup")
+def start_warmup() -> None:
+    """
+    起動時の準備を別スレッドで始める関数(fork前に済ませていれば何もしない)
+    """
+    if not warmup.status.ready:
+        Thread(target=warmup.run, daemon=True).start()
+
+
+@app.on_event("startup")
+async def limit_threads() -> None:
+    """
+    同期関数のハンドラを実行するスレッド数を、形態素解析器の数にそろえる関数
+    requirements.txtのstarlette(0.13)は、asyncioの既定のexecutorで同期関数を実行する
+    """
+    executor = ThreadPoolExecutor(max_workers=threads)
+    asyncio.get_running_loop().set_default_executor(executor)
+    try:
+        import anyio  # 新しいstarletteはanyioのスレッド数の上限を使う
+    except ImportError:
+        return
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+
+
+@app.get("/shiritori/", response_model=str)
+def hello(request: Request) -> RawResponse:
+    return hello_body.respond(request, MODES_MAX_AGE)
+
+
+@app.get("/shiritori/ready/")
+def get_readiness() -> JSONResponse:
+    """
+    起動時の準備の状況を返す関数、準備中であればステータスコード503を返す
+    """
+    status = warmup.status
+    return JSONResponse(status._asdict(), status_code=200 if status.ready else 503)
+
+
+@app.get("/_ah/warmup")
+async def wait_warmup() -> dict:
+    """
+    App Engineのウォームアップリクエストを受ける関数
+    準備が終わるまで待ってから返すので、その後に来るリクエストは準備を待たない
+    ハンドラ用のスレッドを埋めないように、待つのは専用のスレッドで行う
+    """
+    await asyncio.get_running_loop().run_in_executor(warmup_executor, warmup.wait)
+    return warmup.status._asdict()
 
-@app.get("/shiritori/")
-def hello() -> str:
-    return "Hello"
 
 @app.get("/")
 def default() -> RedirectResponse:
     return RedirectResponse("docs/")
 
 
+def serialize(response: Judgement) -> RawResponse:
+    """
+    判定結果をJSONにする関数
+    FastAPIに任せるとresponse_modelでの検証とjsonable_encoderを通るので、直接JSONにして返す
+    (スキーマとドキュメントはresponse_modelのものが使われる)
+    """
+    with STAGE_SECONDS.time("serialize"):
+        return RawResponse(response.to_json(), media_type="application/json")
+
+
+def serialize_all(responses: Iterable[Judgement]) -> RawResponse:
+    """
+    判定結果のリストをJSONにする関数
+    """
+    with STAGE_SECONDS.time("serialize"):
+        return RawResponse(judgements_to_json(responses), media_type="application/json")
+
+
 @app.get("/shiritori/{mode}", response_model=Response)
 def judge_valid_word(
     *,
     mode: int = Path(..., ge=0, lt=len(Mode)),
     text: str,
     head_word: str
-) -> Response:
+) -> RawResponse:
     """	
     入力された文字の品詞などが正しいのかを判定する関数	
     """
+    with REQUEST_SECONDS.time("judge_valid_word"):
+        mode_word_class: str = word_classes[mode].class_name
+        response = shiritori.is_correct_word(mode_word_class, text, head_word)
+        return serialize(response)
+
+
+@app.post("/shiritori/batch/", response_model=List[Response])
+def judge_valid_words(requests: List[JudgeRequest]) -> RawResponse:
+    """
+    (品詞, 入力された文字, 頭文字)のリストをまとめて判定する関数
+    """
+    return serialize_all(
+        shiritori.is_correct_words(
+            [
+                (word_classes[request.mode].class_name, request.text, request.head_word)
+                for request in requests
+            ]
+        )
+    )
+
+
+@app.post("/shiritori/{mode}/chain/", response_model=List[Response])
+def judge_valid_chain(
+    *,
+    mode: int = Path(..., ge=0, lt=len(Mode)),
+    request: ChainRequest
+) -> RawResponse:
+    """
+    しりとりの流れを頭文字から順に判定する関数
+    """
+    mode_word_class: str = word_classes[mode].class_name
+    return serialize_all(
+        shiritori.judge_chain(mode_word_class, request.texts, request.head_word)
+    )
+
+
+@app.get("/shiritori/{mode}/hint/", response_model=Response)
+def get_hint(
+    *,
+    mode: int = Path(..., ge=0, lt=len(Mode)),
+    head_word: str
+) -> RawResponse:
+    """
+    頭文字がhead_wordで品詞がmodeの単語を、読みの索引から1つ返す関数
+    """
     mode_word_class: str = word_classes[mode].class_name
-    response: Response = shiritori.is_correct_word(mode_word_class, text, head_word)
-    return response
+    return serialize(shiritori.hint(mode_word_class, head_word))
+
+
+@app.post("/shiritori/{mode}/opponent/", response_model=Response)
+def get_opponent_word(
+    *,
+    mode: int = Path(..., ge=0, lt=len(Mode)),
+    request: OpponentRequest
+) -> RawResponse:
+    """
+    コンピュータの対戦相手として、頭文字がhead_wordで品詞がmodeの単語を返す関数
+    usedにそのゲームで使われた単語を渡すと、同じよみの単語は選ばない
+    """
+    mode_word_class: str = word_classes[mode].class_name
+    return serialize(
+        shiritori.opponent(
+            mode_word_class,
+            request.head_word,
+            request.used,
+            Difficulty(request.difficulty),
+        )
+    )
+
+
+def get_session(session_id: str) -> Session:
+    """
+    セッションを返す関数、ないか有効期限が切れていれば404を返す
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="セッションが見つかりません")
+    return session
+
+
+@app.post("/shiritori/sessions/", response_model=SessionResponse)
+def create_session(request: SessionRequest) -> SessionResponse:
+    """
+    品詞modeでしりとりのセッションを開始し、セッションIDと最初の頭文字を返す関数
+    """
+    mode_word_class: str = word_classes[request.mode].class_name
+    session = sessions.create(mode_word_class, shiritori.make_initial_word().next_head)
+    return SessionResponse(
+        session_id=session.session_id,
+        word_class=session.mode,
+        head_word=session.head_word,
+    )
+
+
+@app.post("/shiritori/sessions/{session_id}/judge/", response_model=Response)
+def judge_session_word(session_id: str, request: SessionJudgeRequest) -> RawResponse:
+    """
+    セッションの頭文字から始まり、まだ使われていない単語かを判定する関数
+    """
+    return serialize(shiritori.judge_session(get_session(session_id), request.text))
+
+
+@app.post("/shiritori/sessions/{session_id}/opponent/", response_model=Response)
+def get_session_opponent_word(
+    session_id: str, request: SessionOpponentRequest
+) -> RawResponse:
+    """
+    セッションの頭文字に対するコンピュータの手を返す関数
+    """
+    return serialize(
+        shiritori.move_session(get_session(session_id), Difficulty(request.difficulty))
+    )
+
+
+@app.delete("/shiritori/sessions/{session_id}")
+def end_session(session_id: str) -> dict:
+    """
+    セッションを終了し、使われた単語の数を返す関数
+    """
+    session = sessions.end(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="セッションが見つかりません")
+    return {"used": len(session.used)}
+
+
+@app.get("/shiritori/sessions/")
+def get_session_info() -> dict:
+    """
+    セッションの統計情報を返す関数
+    """
+    return sessions.info._asdict()
+
 
 @app.get("/shiritori/head_word/", response_model=Response)
-def get_initial_word() -> Response:
+def get_initial_word() -> RawResponse:
     """	
     ゲーム開始時に出題する頭文字を生成する関数	
     """
-    return shiritori.make_initial_word()
+    with REQUEST_SECONDS.time("get_initial_word"):
+        # make_initial_wordと同じ確率で選ばれるように、候補のJSONから選ぶ
+        return RawResponse(
+            choice(initial_word_bodies),
+            media_type="application/json",
+            headers={"Cache-Control": "no-store"},
+        )
 
 
-@app.get("/shiritori/modes/")
-def get_mode() -> dict:
+@app.get("/shiritori/modes/", response_model=dict)
+def get_mode(request: Request) -> RawResponse:
     """	
     しりとりの品詞のモード一覧を返す関数	
+    あらかじめJSONにしたものを返し、ETagで変わっていないことを確かめられるようにする
+    """
+    return modes_body.respond(request, MODES_MAX_AGE)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    """
+    計測結果をPrometheusのテキスト形式で返す関数、計測していなければ404を返す
     """
-    return dict(word_classes)
+    if not registry.enabled:
+        raise HTTPException(status_code=404, detail="計測していません")
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/shiritori/cache/")
+def get_cache_info() -> dict:
+    """
+    形態素解析結果のキャッシュの統計情報を返す関数
+    """
+    return shiritori.analyses.info._asdict()
+
+
+def serve(host: str, port: int) -> None:
+    """
+    辞書や索引を読み込んだ状態からworkers個のプロセスをforkし、同じソケットで待ち受ける関数
+    fork前に読み込んだものはコピーオンライトで共有されるので、プロセスごとに読み込みなおさない
+    セッションはプロセスごとに持つので、セッションを使うときはworkersを1にする
+    """
+    import uvicorn
+
+    config = uvicorn.Config(app, host=host, port=port)
+    sock = config.bind_socket()
+    warmup.run()  # 準備も済ませてからforkすれば、解析結果のキャッシュも共有される
+    # 参照カウント以外の理由で共有しているページに書き込まないように、
+    # 読み込み済みのオブジェクトをGCの対象から外しておく
+    gc.freeze()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame) -> None:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    # SHIRITORI_WORKERS=4 python main.py 等のコマンドで、4プロセスで起動できる
+    serve(
+        os.environ.get("HOST", "0.0.0.0"),
+        int(os.environ.get("PORT", 8000)),
+    )
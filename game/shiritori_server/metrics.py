@@ -0,0 +1,196 @@
+"""
+サーバの処理時間や判定結果を数え、Prometheusのテキスト形式で返すためのモジュール
+
+    $ SHIRITORI_METRICS=1 uvicorn main:app
+等のコマンドで起動すると計測し、/metricsで計測結果を返す
+計測しないとき(既定)や、Registry.pausedのwithブロックの中(起動時の準備等)では、
+timeやincは何もせずに返る
+"""
+
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from threading import Lock, local
+from typing import ContextManager, Dict, Iterator, List, Sequence, Tuple
+
+# 処理時間のヒストグラムの区切り(秒)
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0
+)
+NULL_TIMER = nullcontext()  # 計測しないときに返す、何もしないコンテキストマネージャ
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """ラベルを{name="value",...}の形式にする関数"""
+    if not names:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, v) for k, v in zip(names, values)) + "}"
+
+
+class Counter:
+    """ラベルごとに回数を数えるクラス"""
+
+    def __init__(
+        self, registry: "Registry", name: str, help: str, labelnames: Sequence[str]
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.__values: Dict[Tuple[str, ...], float] = {}
+        self.__lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """labelsの回数をamount増やすメソッド"""
+        if not self.registry.recording:
+            return
+        with self.__lock:
+            self.__values[labels] = self.__values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} counter".format(self.name),
+        ]
+        with self.__lock:
+            for labels, value in sorted(self.__values.items()):
+                label_text = format_labels(self.labelnames, labels)
+                lines.append("{}{} {}".format(self.name, label_text, value))
+        return lines
+
+
+class Timer:
+    """withブロックの処理時間をヒストグラムに記録するコンテキストマネージャ"""
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Histogram:
+    """ラベルごとに値の分布(区切りごとの累積数、合計、個数)を記録するクラス"""
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # ラベルと、[区切りごとの個数(最後は区切りを超えたもの)..., 合計]の辞書
+        self.__values: Dict[Tuple[str, ...], List[float]] = {}
+        self.__lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """labelsの値としてvalueを記録するメソッド"""
+        if not self.registry.recording:
+            return
+        with self.__lock:
+            values = self.__values.get(labels)
+            if values is None:
+                values = self.__values[labels] = [0] * (len(self.buckets) + 2)
+            values[bisect_left(self.buckets, value)] += 1
+            values[-1] += value
+
+    def time(self, *labels: str) -> ContextManager:
+        """withブロックの処理時間を記録するコンテキストマネージャを返すメソッド"""
+        if not self.registry.recording:
+            return NULL_TIMER
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        names = self.labelnames + ("le",)
+        with self.__lock:
+            for labels, values in sorted(self.__values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), values):
+                    cumulative += count
+                    label_text = format_labels(names, labels + (str(bound),))
+                    lines.append("{}_bucket{} {}".format(self.name, label_text, cumulative))
+                label_text = format_labels(self.labelnames, labels)
+                lines.append("{}_sum{} {}".format(self.name, label_text, values[-1]))
+                lines.append("{}_count{} {}".format(self.name, label_text, cumulative))
+        return lines
+
+
+class Registry:
+    """計測するものをまとめて持ち、テキスト形式にするクラス"""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled  # Falseなら何も記録しない
+        self.__metrics: List = []
+        self.__local = local()  # スレッドごとの、記録を止めているかどうか
+
+    @property
+    def recording(self) -> bool:
+        """このスレッドで記録するかを返すプロパティ"""
+        return self.enabled and not getattr(self.__local, "paused", False)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        withブロックの間、このスレッドでは記録しないようにするメソッド
+        起動時の準備のような、実際のリクエストではない判定を計測結果に含めないために使う
+        (他のスレッドで処理しているリクエストは記録される)
+        """
+        self.__local.paused = True
+        try:
+            yield
+        finally:
+            self.__local.paused = False
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        counter = Counter(self, name, help, labelnames)
+        self.__metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(self, name, help, labelnames, buckets)
+        self.__metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式にするメソッド"""
+        lines: List[str] = []
+        for metric in self.__metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()  # サーバ全体で共有する計測結果
+# Shiritori.is_correct_word等の段階ごとの処理時間
+STAGE_SECONDS = registry.histogram(
+    "shiritori_stage_seconds", "Time spent in each judging stage.", ["stage"]
+)
+# APIの関数ごとの処理時間(レスポンスの作成を含む)
+REQUEST_SECONDS = registry.histogram(
+    "shiritori_request_seconds", "Time spent handling each endpoint.", ["endpoint"]
+)
+# 品詞と判定結果ごとの判定回数
+JUDGEMENTS = registry.counter(
+    "shiritori_judgements_total", "Number of judged words.", ["mode", "outcome"]
+)
@@ -0,0 +1,241 @@
+"""
+しりとりに使える単語の一覧(1行1語のテキスト)を、あらかじめ形態素解析して
+(品詞, 頭文字)ごとに引ける読みの索引にコンパイルし、メモリマップして読むモジュール
+
+索引のフォーマット(数値はすべてリトルエンディアンの符号なし32bit整数)
+    ヘッダ: マジックナンバーb"RIDX", 単語数n, ハッシュ表の大きさm, 目次の長さ, 一覧のCRC32
+    索引: 単語ごとのデータ部の開始位置 n + 1個(最後はデータ部の終端)
+    ハッシュ表: 表層形のCRC32で引く、単語の番号 + 1(空きは0) m個(線形探索)
+    目次: [品詞, 頭文字, 開始番号, 終了番号]のリストをJSONにしたUTF-8
+    データ部: 単語ごとに「表層形\\0よみ\\0品詞」をUTF-8にしたもの
+単語は(品詞, 頭文字, よみ)の順に並んでいるので、同じ(品詞, 頭文字)の単語は連続している
+
+    $ python reading_index.py words.txt
+等のコマンドで、テキストと同じ場所に拡張子.binの索引を作成できる
+サーバは索引をメモリマップするだけなので、デプロイ前(deploy.sh)に作成してアップロードする
+"""
+
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from katahira import KataHira
+
+MAGIC = b"RIDX"
+# マジックナンバー、単語数、ハッシュ表の大きさ、目次の長さ、作成元の一覧の内容のCRC32
+HEADER = struct.Struct("<4sIIII")
+OFFSET = struct.Struct("<I")  # 索引、ハッシュ表の1要素
+OFFSET_PAIR = struct.Struct("<II")  # 単語の開始位置と終了位置
+SEPARATOR = "\0"  # 表層形、よみ、品詞の区切り文字
+
+
+class IndexedWord(NamedTuple):
+    """索引の単語1つ分を格納する名前付きタプル"""
+
+    surface: str  # 表層形
+    reading: str  # よみ(カタカナ)
+    word_class: str  # 品詞
+
+
+def index_path_of(words_path: str) -> str:
+    """単語の一覧に対応する索引のパスを返す関数"""
+    return os.path.splitext(words_path)[0] + ".bin"
+
+
+def hash_of(surface: str) -> int:
+    """ハッシュ表に使う、プロセスによらない表層形のハッシュ値を返す関数"""
+    return zlib.crc32(surface.encode("utf-8"))
+
+
+def checksum_of(words_path: str) -> int:
+    """
+    索引がどの一覧から作成されたかを確かめるための、一覧の内容のCRC32を返す関数
+    デプロイ等で更新日時が変わっても、内容が同じなら同じ値になる
+    """
+    with open(words_path, mode="rb") as f:
+        return zlib.crc32(f.read())
+
+
+def is_built_from(index_path: str, words_path: str) -> bool:
+    """index_pathが、一覧words_pathの今の内容から作成された索引かを返す関数"""
+    try:
+        with open(index_path, mode="rb") as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return False
+    if len(header) != HEADER.size:
+        return False
+    magic, _, _, _, checksum = HEADER.unpack(header)
+    return magic == MAGIC and checksum == checksum_of(words_path)
+
+
+def build(
+    words_path: str,
+    index_path: str,
+    parse: Callable[[str], Tuple[str, str, Optional[str], bool]],
+) -> int:
+    """
+    単語の一覧words_pathを形態素解析して索引index_pathを作成する関数
+    parseにはShiritori.parse(解析結果のAnalysisを返す)を渡す
+    単語1つと解析され、よみが2文字以上のものだけを登録する
+    書き込み中のファイルを読まれないように、一時ファイルに書いてから置き換える
+    どの一覧から作成したかわかるように、ヘッダに一覧の内容のCRC32を記録する
+    単語数を返す
+    """
+    katahira = KataHira()
+    checksum = checksum_of(words_path)
+    words: Dict[str, IndexedWord] = {}
+    with open(words_path, mode="r", encoding="utf-8") as f:
+        for line in f:
+            text = line.strip()
+            if not text or text in words:
+                continue
+            surface, word_class, reading, is_one_word = parse(text)
+            if not is_one_word or reading is None or len(reading) < 2:
+                continue
+            # 解析のやり直しを省けるように、入力と表層形が同じものだけを登録する
+            if surface == text:
+                words[text] = IndexedWord(surface, reading, word_class)
+    entries = sorted(
+        words.values(), key=lambda x: (x.word_class, katahira.head(x.reading), x.reading)
+    )
+
+    records: List[bytes] = []
+    directory: List[list] = []  # [品詞, 頭文字, 開始番号, 終了番号]のリスト
+    for i, word in enumerate(entries):
+        records.append(SEPARATOR.join(word).encode("utf-8"))
+        key = [word.word_class, katahira.head(word.reading)]
+        if directory and directory[-1][:2] == key:
+            directory[-1][3] = i + 1
+        else:
+            directory.append(key + [i, i + 1])
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    # 埋まり具合が半分以下になるように、単語数の2倍以上の2のべき乗にする
+    number_of_slots = 1 << (2 * len(entries)).bit_length()
+    slots = [0] * number_of_slots
+    for i, word in enumerate(entries):
+        slot = hash_of(word.surface) & (number_of_slots - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (number_of_slots - 1)
+        slots[slot] = i + 1
+    encoded_directory = json.dumps(directory, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, mode="wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC, len(entries), number_of_slots, len(encoded_directory), checksum
+            )
+        )
+        f.write(struct.pack("<{}I".format(len(offsets)), *offsets))
+        f.write(struct.pack("<{}I".format(number_of_slots), *slots))
+        f.write(encoded_directory)
+        f.write(b"".join(records))
+    os.replace(tmp_path, index_path)
+    return len(entries)
+
+
+class ReadingIndex:
+    """
+    読みの索引をメモリマップして読むクラス
+    目次だけをインスタンス化時に読み込み、単語はアクセスされたときにだけデコードする
+    """
+
+    def __init__(self, index_path: str) -> None:
+        with open(index_path, mode="rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self.__map, 0)
+        magic, self.__length, self.__number_of_slots, directory_length, _ = header
+        if magic != MAGIC:
+            raise ValueError("読みの索引のファイルではありません: " + index_path)
+        self.__index_start = HEADER.size  # 索引の開始位置
+        self.__slots_start = self.__index_start + OFFSET.size * (self.__length + 1)
+        directory_start = self.__slots_start + OFFSET.size * self.__number_of_slots
+        self.__data_start = directory_start + directory_length  # データ部の開始位置
+        # (品詞, 頭文字)と、その単語の(開始番号, 終了番号)の辞書
+        self.__directory: Dict[Tuple[str, str], Tuple[int, int]] = {
+            (word_class, head): (start, end)
+            for word_class, head, start, end in json.loads(
+                self.__map[directory_start : self.__data_start].decode("utf-8")
+            )
+        }
+
+    @classmethod
+    def open(
+        cls,
+        words_path: str,
+        parse: Callable[[str], Tuple[str, str, Optional[str], bool]],
+        build_dir: Optional[str] = None,
+    ) -> "ReadingIndex":
+        """
+        単語の一覧に対応する索引を開くクラスメソッド
+        一覧と同じ場所に、一覧の今の内容から作成した索引があればそれを開く
+        ない、もしくは内容が異なる場合は、書き込めるbuild_dir(既定は/tmp等の一時ディレクトリ)に
+        parseで作成してから開く(App Engine等ではアプリのディレクトリに書き込めないため)
+        """
+        index_path = index_path_of(words_path)
+        if not is_built_from(index_path, words_path):
+            index_path = os.path.join(
+                build_dir or tempfile.gettempdir(), os.path.basename(index_path)
+            )
+            if not is_built_from(index_path, words_path):
+                build(words_path, index_path, parse)
+        return cls(index_path)
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __getitem__(self, i: int) -> IndexedWord:
+        """i番目の単語を返す"""
+        if not 0 <= i < self.__length:
+            raise IndexError("読みの索引の範囲外です")
+        start, end = OFFSET_PAIR.unpack_from(
+            self.__map, self.__index_start + OFFSET.size * i
+        )
+        record = self.__map[self.__data_start + start : self.__data_start + end]
+        return IndexedWord(*record.decode("utf-8").split(SEPARATOR))
+
+    def lookup(self, surface: str) -> Optional[IndexedWord]:
+        """表層形がsurfaceの単語をハッシュ表から引くメソッド、なければNoneを返す"""
+        if not self.__number_of_slots:
+            return None
+        mask = self.__number_of_slots - 1
+        slot = hash_of(surface) & mask
+        while True:
+            (i,) = OFFSET.unpack_from(self.__map, self.__slots_start + OFFSET.size * slot)
+            if not i:
+                return None
+            word = self[i - 1]
+            if word.surface == surface:
+                return word
+            slot = (slot + 1) & mask
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """索引に登録されている(品詞, 頭文字)のリストを返すメソッド"""
+        return list(self.__directory)
+
+    def candidates(self, word_class: str, head: str) -> range:
+        """品詞がword_classで、頭文字(ひらがな)がheadの単語の番号の範囲を返すメソッド"""
+        start, end = self.__directory.get((word_class, head), (0, 0))
+        return range(start, end)
+
+    def close(self) -> None:
+        """メモリマップを閉じるメソッド"""
+        self.__map.close()
+
+
+if __name__ == "__main__":
+    from shiritori import Shiritori
+
+    parse = Shiritori().parse
+    for path in sys.argv[1:]:
+        number_of_words = build(path, index_path_of(path), parse)
+        print("{}: {}語".format(index_path_of(path), number_of_words))
@@ -0,0 +1,102 @@
+import secrets
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple, Optional, Set
+
+
+class SessionInfo(NamedTuple):
+    """セッションの統計情報を格納する名前付きタプル"""
+
+    size: int  # 現在のセッション数
+    maxsize: int  # セッション数の上限
+    expired: int  # 有効期限が切れたため削除した数
+    evictions: int  # 上限を超えたため追い出した数
+
+
+class Session:
+    """
+    しりとり1ゲーム分の状態を持つクラス
+    数万のセッションを持てるように、__slots__で属性を固定してメモリを抑える
+    """
+
+    __slots__ = ("session_id", "mode", "head_word", "used", "expires", "lock")
+
+    def __init__(
+        self, session_id: str, mode: str, head_word: str, expires: float
+    ) -> None:
+        self.session_id = session_id
+        self.mode = mode  # 品詞
+        self.head_word = head_word  # 次の単語の頭文字
+        self.used: Set[str] = set()  # 使われた単語のよみ(ひらがな)
+        self.expires = expires  # 有効期限(time.monotonicの値)
+        self.lock = Lock()  # 同じセッションへの判定を1つずつ行うためのロック
+
+
+class SessionStore:
+    """
+    セッションをメモリ上に持つクラス
+    最後に使われた順に並べておき、有効期限が切れたものを古い方から削除する
+    セッション数がmaxsizeを超えたときは、最も長く使われていないものから追い出す
+    """
+
+    def __init__(self, ttl: float = 1800.0, maxsize: int = 50000) -> None:
+        """
+        ttl: 最後に使われてからセッションを削除するまでの秒数
+        maxsize: セッション数の上限
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.__sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.__lock = Lock()
+        self.__expired = 0
+        self.__evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__sessions)
+
+    def expire(self, now: float) -> None:
+        """有効期限が切れたセッションを削除するメソッド(ロックを取ってから呼ぶ)"""
+        while self.__sessions:
+            session = next(iter(self.__sessions.values()))
+            if session.expires > now:
+                break
+            self.__sessions.popitem(last=False)
+            self.__expired += 1
+
+    def create(self, mode: str, head_word: str) -> Session:
+        """新しいセッションを作成して返すメソッド"""
+        now = time.monotonic()
+        session = Session(secrets.token_urlsafe(16), mode, head_word, now + self.ttl)
+        with self.__lock:
+            self.expire(now)
+            self.__sessions[session.session_id] = session
+            if len(self.__sessions) > self.maxsize:
+                self.__sessions.popitem(last=False)
+                self.__evictions += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        セッションを返すメソッド、ないか有効期限が切れていればNoneを返す
+        返したセッションの有効期限は延長する
+        """
+        now = time.monotonic()
+        with self.__lock:
+            self.expire(now)
+            session = self.__sessions.get(session_id)
+            if session is not None:
+                session.expires = now + self.ttl
+                self.__sessions.move_to_end(session_id)
+        return session
+
+    def end(self, session_id: str) -> Optional[Session]:
+        """セッションを削除して返すメソッド、なければNoneを返す"""
+        with self.__lock:
+            return self.__sessions.pop(session_id, None)
+
+    @property
+    def info(self) -> SessionInfo:
+        return SessionInfo(
+            len(self.__sessions), self.maxsize, self.__expired, self.__evictions
+        )
@@ -1,10 +1,16 @@
+import json
 from enum import Enum
 from random import randrange
-from typing import NamedTuple, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 import MeCab
+from cache import LRUCache
 from katahira import KataHira
-from pydantic import BaseModel
+from metrics import JUDGEMENTS, STAGE_SECONDS
+from pydantic import BaseModel, Field
+from reading_index import IndexedWord, ReadingIndex
+from session import Session
+from tagger_pool import TaggerPool
 
 
 class WordClass(NamedTuple):
@@ -18,6 +24,73 @@ class Mode(Enum):
     ADJECTIVE = WordClass(2, "形容詞")
 
 
+class Difficulty(Enum):
+    """コンピュータの対戦相手の強さの列挙体"""
+
+    EASY = 0  # 続けやすい文字で終わる単語を選ぶ
+    NORMAL = 1  # ランダムに選ぶ
+    HARD = 2  # 続けにくい文字(頭文字になる単語が少ない文字)で終わる単語を選ぶ
+
+
+class Analysis(NamedTuple):
+    """
+    形態素解析の結果のうち、判定に使う値だけを取り出した名前付きタプル
+    MeCab.Nodeは次の解析で無効になるので、値として保持しておく
+    """
+
+    surface: str  # 先頭の単語の表層形
+    word_class: str  # 先頭の単語の品詞
+    reading: Optional[str]  # 先頭の単語のよみ(解析できなかった場合はNone)
+    is_one_word: bool  # 単語1つのみであるか
+
+
+class JudgeRequest(BaseModel):
+    """一括判定で使う、判定1件分のリクエスト"""
+
+    mode: int = Field(..., ge=0, lt=len(Mode))
+    text: str
+    head_word: str
+
+
+class ChainRequest(BaseModel):
+    """しりとりの流れ(texts)を頭文字head_wordから順に判定するリクエスト"""
+
+    head_word: str
+    texts: List[str]
+
+
+class OpponentRequest(BaseModel):
+    """頭文字head_wordに対するコンピュータの手を求めるリクエスト"""
+
+    head_word: str
+    used: List[str] = []  # このゲームですでに使われた単語
+    difficulty: int = Field(Difficulty.NORMAL.value, ge=0, lt=len(Difficulty))
+
+
+class SessionRequest(BaseModel):
+    """品詞modeでしりとりのセッションを開始するリクエスト"""
+
+    mode: int = Field(..., ge=0, lt=len(Mode))
+
+
+class SessionJudgeRequest(BaseModel):
+    """セッションの頭文字から始まる単語textを判定するリクエスト"""
+
+    text: str
+
+
+class SessionOpponentRequest(BaseModel):
+    """セッションの頭文字に対するコンピュータの手を求めるリクエスト"""
+
+    difficulty: int = Field(Difficulty.NORMAL.value, ge=0, lt=len(Difficulty))
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    word_class: str
+    head_word: str
+
+
 class Response(BaseModel):
     word: str
     word_class: str
@@ -26,18 +99,112 @@ class Response(BaseModel):
     next_head: str
 
 
+# FastAPIのJSONResponseと同じ形式でJSONにするエンコーダ(引数の処理を毎回しないように作っておく)
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+class Judgement(NamedTuple):
+    """
+    判定結果を格納する名前付きタプル
+    Responseと同じ項目を同じ順に持ち、APIのスキーマ(ドキュメント)にはResponseを使う
+    検証や項目ごとの代入をしない分、pydanticのモデルより速く作れる
+    """
+
+    word: str
+    word_class: str
+    is_correct: bool
+    message: str
+    next_head: str
+
+    def to_json(self) -> bytes:
+        """Responseをレスポンスに使ったときと同じJSONにするメソッド"""
+        return JSON_ENCODER.encode(self._asdict()).encode("utf-8")
+
+
+def judgements_to_json(judgements: Iterable[Judgement]) -> bytes:
+    """判定結果のリストを、List[Response]をレスポンスに使ったときと同じJSONにする関数"""
+    return JSON_ENCODER.encode([x._asdict() for x in judgements]).encode("utf-8")
+
+
+class WordGraph:
+    """
+    読みの索引の単語を、頭文字から尻の文字への辺とみなしたグラフ
+    起動時に一度だけ作り、以降は読み込みしかしないので、同時に進む複数のゲームで共有できる
+    """
+
+    def __init__(self, index: ReadingIndex) -> None:
+        katahira = KataHira()
+        self.index = index
+        # (品詞, 頭文字)と、その単語の番号を尻の文字から続けにくい順に並べたタプルの辞書
+        # 「ん」で終わる単語はその時点で負けになるので含めない
+        self.moves: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+        for word_class, head in index.keys():
+            tails = {
+                i: katahira.tail(index[i].reading)
+                for i in index.candidates(word_class, head)
+            }
+            self.moves[(word_class, head)] = tuple(
+                sorted(
+                    (i for i, tail in tails.items() if tail != "ん"),
+                    key=lambda i: len(index.candidates(word_class, tails[i])),
+                )
+            )
+
+    def choose(
+        self, word_class: str, head: str, used: Set[str], difficulty: Difficulty
+    ) -> Optional[IndexedWord]:
+        """
+        品詞がword_classで頭文字がheadの単語のうち、よみ(ひらがな)がusedにないものを
+        difficultyに応じて1つ選ぶメソッド、なければNoneを返す
+        使われた単語の分だけ読み飛ばすので、usedが小さければO(1)で選べる
+        """
+        katahira = KataHira()
+        moves = self.moves.get((word_class, head), ())
+        if difficulty == Difficulty.HARD:
+            order = iter(moves)
+        elif difficulty == Difficulty.EASY:
+            order = reversed(moves)
+        else:  # ランダムな位置から順に見る
+            # リストをコピーしないように、添字を一周させる
+            start = randrange(len(moves)) if moves else 0
+            order = (moves[(start + k) % len(moves)] for k in range(len(moves)))
+        for i in order:
+            word = self.index[i]
+            if katahira.normalize(word.reading) not in used:
+                return word
+        return None
+
+
 class Shiritori:
-    def __init__(self) -> None:
+    # ゲーム開始時に出題する頭文字の元になる、カタカナのァからロまでのユニコード値
+    initial_head_range = range(12449, 12526)
+
+    def __init__(
+        self,
+        cache_size: int = 1024,
+        index: Optional[ReadingIndex] = None,
+        taggers: int = 1,
+    ) -> None:
+        """
+        indexに読みの索引を渡すと、登録された単語はMeCabを使わずに判定し、ヒントも出せる
+        taggersは形態素解析を同時に行える数(判定を行うスレッド数と同じにする)
+        """
         self.katahira = KataHira()
-        self.m = MeCab.Tagger()
+        # MeCab.Taggerはスレッド間で共有できないので、解析のたびに貸し出す
+        self.taggers: TaggerPool[MeCab.Tagger] = TaggerPool(MeCab.Tagger, taggers)
+        # 同じ文字の形態素解析をやり直さないためのキャッシュ
+        self.analyses: LRUCache[str, Analysis] = LRUCache(cache_size)
+        self.index = index
+        # コンピュータの対戦相手が使うグラフ(索引がなければ対戦できない)
+        self.graph = WordGraph(index) if index is not None else None
 
-    def make_initial_word(self) -> Response:
+    def make_initial_word(self) -> Judgement:
         """	
         ゲーム開始時に出題する頭文字を生成するメソッド	
         カタカナのァからロまでの間の値から一つ選び、	
         それをひらがなに直す(小文字を避けるため)	
         """
-        return Response(
+        return Judgement(
             word="",
             word_class = "",
             is_correct=False,
@@ -45,33 +212,229 @@ class Shiritori:
             next_head=self.katahira.convert((chr(randrange(12449, 12526)))),
         )
 
-    def is_correct_word(self, mode: str, text: str, head_word: str) -> Response:
+    def make_initial_words(self) -> List[Judgement]:
+        """
+        make_initial_wordが返しうるものを、選ばれる確率の分だけ重複させて全て返すメソッド
+        """
+        return [
+            Judgement(
+                word="",
+                word_class="",
+                is_correct=False,
+                message="",
+                next_head=self.katahira.convert(chr(x)),
+            )
+            for x in Shiritori.initial_head_range
+        ]
+
+    def hint(self, mode: str, head_word: str) -> Judgement:
+        """
+        読みの索引から、品詞がmodeで頭文字がhead_wordの単語を1つ選んで返すメソッド
+        見つからなければis_correctがFalseのものを返す
+        """
+        if self.index is None:  # 索引を読み込めなかったときは、ヒントを出せない
+            return Judgement("", mode, False, "候補が見つかりませんでした。", head_word)
+        candidates = self.index.candidates(mode, head_word)
+        if not candidates:
+            return Judgement("", mode, False, "候補が見つかりませんでした。", head_word)
+        word = self.index[candidates[randrange(len(candidates))]]
+        return Judgement(
+            word.surface, mode, True, "", self.katahira.tail(word.reading)
+        )
+
+    def opponent(
+        self, mode: str, head_word: str, used: List[str], difficulty: Difficulty
+    ) -> Judgement:
+        """
+        コンピュータの対戦相手として、品詞がmodeで頭文字がhead_wordの単語を返すメソッド
+        このゲームですでに使われた単語usedと、よみが同じ単語は選ばない
+        選べる単語がなければ、is_correctがFalseのもの(コンピュータの負け)を返す
+        """
+        used_readings = set()
+        for text in used:
+            reading = self.analyze(text).reading
+            if reading is not None:
+                used_readings.add(self.katahira.normalize(reading))
+        return self.move(mode, head_word, used_readings, difficulty)
+
+    def move(
+        self, mode: str, head_word: str, used_readings: Set[str], difficulty: Difficulty
+    ) -> Judgement:
+        """
+        よみ(ひらがな)がused_readingsにない単語から、コンピュータの手を選ぶメソッド
+        """
+        return self.move_judgement(
+            mode, head_word, self.choose(mode, head_word, used_readings, difficulty)
+        )
+
+    def choose(
+        self, mode: str, head_word: str, used_readings: Set[str], difficulty: Difficulty
+    ) -> Optional[IndexedWord]:
+        """
+        よみ(ひらがな)がused_readingsにない単語から、コンピュータの手を索引の単語で返すメソッド
+        選べる単語がなければNoneを返す
+        """
+        if self.graph is None:
+            return None
+        return self.graph.choose(mode, head_word, used_readings, difficulty)
+
+    def move_judgement(
+        self, mode: str, head_word: str, word: Optional[IndexedWord]
+    ) -> Judgement:
+        """chooseで選んだ単語wordを、コンピュータの手として返すメソッド"""
+        if word is None:
+            return Judgement(
+                "", mode, False, "参りました。続く単語が見つかりませんでした。", head_word
+            )
+        return Judgement(
+            word.surface, mode, True, "", self.katahira.tail(word.reading)
+        )
+
+    def judge_session(self, session: Session, text: str) -> Judgement:
+        """
+        セッションの頭文字と品詞で入力された文字textを判定するメソッド
+        しりとりの規則どおり、そのセッションですでに使われたよみの単語と、
+        「ん」で終わる単語は不正解にする
+        正解であればよみを使われたものとして記録し、セッションの頭文字を更新する
+        """
+        analysis = self.analyze(text)  # 時間のかかる解析はロックの外で行う
+        with session.lock:
+            response = self.judge(session.mode, analysis, session.head_word)
+            if not response.is_correct:
+                return response
+            reading = self.katahira.normalize(analysis.reading)
+            if reading in session.used:
+                message = "すでに使われた単語です。"
+            elif response.next_head == "ん":
+                message = "最後が「ん」になっています"
+            else:
+                session.used.add(reading)
+                session.head_word = response.next_head
+                return response
+            return response._replace(
+                is_correct=False, message=message, next_head=session.head_word
+            )
+
+    def move_session(self, session: Session, difficulty: Difficulty) -> Judgement:
+        """
+        セッションの頭文字に対するコンピュータの手を返すメソッド
+        選んだ単語は使われたものとして記録し、セッションの頭文字を更新する
+        """
+        with session.lock:
+            word = self.choose(session.mode, session.head_word, session.used, difficulty)
+            response = self.move_judgement(session.mode, session.head_word, word)
+            if word is not None:
+                # 選んだときのよみを記録する(MeCabで解析しなおすと異なることがある)
+                session.used.add(self.katahira.normalize(word.reading))
+                session.head_word = response.next_head
+            return response
+
+    def analyze(self, text: str) -> Analysis:
+        """
+        入力された文字textを形態素解析し、判定に使う値を返すメソッド
+        一度解析した文字はキャッシュから返す
+        """
+        return self.analyses.get_or_set(text, self.lookup)
+
+    def lookup(self, text: str) -> Analysis:
+        """
+        入力された文字textが読みの索引にあれば索引から、なければMeCabで解析した結果を返すメソッド
+        索引はMeCabでの解析結果から作っているので、どちらでも同じ結果になる
+        """
+        if self.index is not None:
+            word = self.index.lookup(text)
+            if word is not None:
+                return Analysis(word.surface, word.word_class, word.reading, True)
+        return self.parse(text)
+
+    def parse(self, text: str) -> Analysis:
+        """
+        MeCabで入力された文字textを形態素解析するメソッド
+        """
+        with self.taggers.checkout() as tagger, STAGE_SECONDS.time("parse"):
+            node = tagger.parseToNode(text).next
+            features = node.feature.split(",")
+            reading = features[6] if len(features) >= 7 else None
+            # 先頭の単語の次はBOS/EOS、さらにその次はNoneであることが期待される
+            is_one_word = node.next is not None and node.next.next is None
+            return Analysis(node.surface, features[0], reading, is_one_word)
+
+    def is_correct_word(self, mode: str, text: str, head_word: str) -> Judgement:
         """	       
         入力された文字が単語であること、	        
         品詞がmodeと同じであることなどを判定するメソッド
         """
-        node = self.m.parseToNode(text).next
-        word = node.surface
-        features = node.feature.split(",")
-        word_class = features[0]
-        response = Response(word=word, word_class=word_class, is_correct=False, message="", next_head=head_word)
-        if len(features) < 7:
-            response.message = "日本語以外が含まれている可能性があります。"
-            return response
+        with STAGE_SECONDS.time("analyze"):
+            analysis = self.analyze(text)
+        return self.judge(mode, analysis, head_word)
+
+    def is_correct_words(self, requests: List[Tuple[str, str, str]]) -> List[Judgement]:
+        """
+        (品詞, 入力された文字, 頭文字)のリストをまとめて判定するメソッド
+        同じ文字の形態素解析は一度だけ行う
+        """
+        analyses: Dict[str, Analysis] = {}
+        responses = []
+        for mode, text, head_word in requests:
+            if text not in analyses:
+                analyses[text] = self.analyze(text)
+            responses.append(self.judge(mode, analyses[text], head_word))
+        return responses
+
+    def judge_chain(self, mode: str, texts: List[str], head_word: str) -> List[Judgement]:
+        """
+        入力された文字のリストtextsを、頭文字head_wordから順にしりとりとして判定するメソッド
+        正解であれば次の判定の頭文字を更新し、不正解であれば同じ頭文字で続ける
+        """
+        analyses: Dict[str, Analysis] = {}
+        responses = []
+        for text in texts:
+            if text not in analyses:
+                analyses[text] = self.analyze(text)
+            response = self.judge(mode, analyses[text], head_word)
+            head_word = response.next_head
+            responses.append(response)
+        return responses
+
+    def judge(self, mode: str, analysis: Analysis, head_word: str) -> Judgement:
+        """
+        形態素解析の結果analysisについて、
+        品詞がmodeと同じであること、頭文字がhead_wordであることなどを判定するメソッド
+        """
+        if analysis.reading is None:
+            JUDGEMENTS.inc(mode, "not_japanese")
+            return Judgement(
+                analysis.surface,
+                analysis.word_class,
+                False,
+                "日本語以外が含まれている可能性があります。",
+                head_word,
+            )
 
-        word_reading_candicate = features[6]
+        word_reading_candicate = analysis.reading
         if len(word_reading_candicate) < 2:
-            response.message = "一字以上のよみを入力してください。"
-            return response
+            JUDGEMENTS.inc(mode, "too_short")
+            return Judgement(
+                analysis.surface,
+                analysis.word_class,
+                False,
+                "一字以上のよみを入力してください。",
+                head_word,
+            )
 
         if word_reading_candicate[-1] == "ー":
             word_reading_candicate = word_reading_candicate[:-1]
         # 一単語か判定
-        judge_one_word = self.judge_one_word(node)
+        with STAGE_SECONDS.time("judge_one_word"):
+            judge_one_word = self.judge_one_word(analysis)
         # 品詞判定
-        judge_word_class = self.judge_correct_word_class(mode, word_class)
+        with STAGE_SECONDS.time("judge_correct_word_class"):
+            judge_word_class = self.judge_correct_word_class(mode, analysis.word_class)
         # 頭文字が期待さされている文字か判定
-        judge_correct_head = self.judge_correct_head(head_word, word_reading_candicate)
+        with STAGE_SECONDS.time("judge_correct_head"):
+            judge_correct_head = self.judge_correct_head(
+                head_word, word_reading_candicate
+            )
         # 総合的に入力された文字textでよいか判定
         is_correct = (
             judge_word_class[0] and judge_correct_head[0] and judge_one_word[0]
@@ -79,19 +442,17 @@ class Shiritori:
         message = judge_one_word[1] + judge_word_class[1] + judge_correct_head[1]
         # is_correctがTrueであれば言葉の尻を取る	
         # Falseであれば、同じhead_wordでやり直してもらう
-        next_head = self.katahira.convert(word_reading_candicate[-1]) if is_correct else head_word
-        response.is_correct = is_correct
-        response.message = message
-        response.next_head = next_head
-        return response
+        next_head = self.katahira.normalize(word_reading_candicate[-1]) if is_correct else head_word
+        JUDGEMENTS.inc(mode, "correct" if is_correct else "incorrect")
+        return Judgement(
+            analysis.surface, analysis.word_class, is_correct, message, next_head
+        )
 
-    def judge_one_word(self, node: MeCab.Node) -> Tuple[bool, str]:
+    def judge_one_word(self, analysis: Analysis) -> Tuple[bool, str]:
         """	
         文章ではなく単語1つのみであることの判定メソッド	
         """
-        node = node.next # BOS/EOSであることが期待される
-        # さらにその次はNoneであることが期待される
-        if node.next: # Noneでない(パiースの結果がまだ存在する)とき
+        if not analysis.is_one_word: # パースの結果がまだ存在するとき
             return (False, "文章もしくは複数の単語が含まれています。")
         return (True, "")
 
@@ -107,7 +468,7 @@ class Shiritori:
         """
         入力された単語が、指定された言葉から始まっているかの判定メソッド
         """
-        hiragana_word = self.katahira.convert(word[0])
+        hiragana_word = self.katahira.head(word)
         if hiragana_word == correct_head:
             return (True, "")
         return (
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from queue import LifoQueue
+from typing import Callable, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class TaggerPool(Generic[T]):
+    """
+    MeCab.Tagger等の、スレッド間で共有できないものをsize個持ち、リクエストごとに貸し出すクラス
+    すべて貸し出し中であれば、返却されるまで待つ
+    最後に返却されたものから貸し出すので、少ない数で足りるときは同じものが使われ続ける
+    """
+
+    def __init__(self, factory: Callable[[], T], size: int = 1) -> None:
+        """
+        factory: 貸し出すものを作る関数(MeCab.Tagger等)
+        size: 貸し出すものの数、同時に処理するスレッド数と同じにすれば待たずに済む
+        """
+        if size < 1:
+            raise ValueError("sizeは1以上にしてください")
+        self.size = size
+        self.__pool: "LifoQueue[T]" = LifoQueue(maxsize=size)
+        for _ in range(size):
+            self.__pool.put(factory())
+
+    @contextmanager
+    def checkout(self) -> Iterator[T]:
+        """withブロックの間だけ1つ貸し出すメソッド"""
+        item = self.__pool.get()
+        try:
+            yield item
+        finally:
+            self.__pool.put(item)
+
+    def available(self) -> int:
+        """貸し出されていないものの数を返すメソッド"""
+        return self.__pool.qsize()
@@ -0,0 +1,67 @@
+import time
+from threading import Event, Lock
+from typing import List, NamedTuple, Optional
+
+from metrics import registry
+from shiritori import Mode, Shiritori
+
+
+class WarmupStatus(NamedTuple):
+    """起動時の準備の状況を格納する名前付きタプル"""
+
+    ready: bool  # 準備が終わったか
+    words: int  # 判定した単語の数
+    seconds: Optional[float]  # 準備にかかった秒数(終わっていなければNone)
+
+
+class Warmup:
+    """
+    起動時に単語の一覧textsを全品詞で判定し、辞書の読み込みや解析結果のキャッシュを済ませるクラス
+    最初のリクエストが辞書の読み込み等を待たないように、準備が終わるまでは準備中と報告する
+    準備のための判定は、判定回数や処理時間の計測結果に含めない
+    """
+
+    def __init__(self, shiritori: Shiritori, texts: List[str]) -> None:
+        self.shiritori = shiritori
+        self.texts = texts
+        self.words = 0  # 判定した単語の数
+        self.seconds: Optional[float] = None  # 準備にかかった秒数
+        self.__done = Event()
+        self.__lock = Lock()  # 2回準備しないように排他する
+
+    def run(self) -> None:
+        """準備を行うメソッド、すでに終わっていれば何もしない"""
+        with self.__lock:
+            if self.__done.is_set():
+                return
+            started = time.perf_counter()
+            head = self.shiritori.make_initial_word().next_head
+            with registry.paused():
+                for text in self.texts:
+                    # 索引にある単語はMeCabを通らないので、解析器も直接使っておく
+                    self.shiritori.parse(text)
+                    for mode in Mode:
+                        self.shiritori.is_correct_word(mode.value.class_name, text, head)
+                    self.words += 1
+            self.seconds = time.perf_counter() - started
+            self.__done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """準備が終わるまで最大timeout秒待ち、終わったかを返すメソッド"""
+        return self.__done.wait(timeout)
+
+    @property
+    def status(self) -> WarmupStatus:
+        return WarmupStatus(self.__done.is_set(), self.words, self.seconds)
+
+
+def read_corpus(words_path: str, size: int) -> List[str]:
+    """単語の一覧words_pathの先頭からsize語を、準備に使う単語として読み込む関数"""
+    texts: List[str] = []
+    with open(words_path, mode="r", encoding="utf-8") as f:
+        for line in f:
+            if len(texts) >= size:
+                break
+            if line.strip():
+                texts.append(line.strip())
+    return texts
@@ -1,7 +1,7 @@
 from typing import List
 from urllib.parse import urlencode
 
-from .game import Score
+from .game import Score, percentile
 
 
 class User:
@@ -19,12 +19,25 @@ class User:
         if not self.scores:
             return ""
         latest_score = self.scores[-1]
-        return "ユーザー名: {}\n正解数: {}\n不正解数: {}\n評価: {}".format(
+        result = "ユーザー名: {}\n正解数: {}\n不正解数: {}\n評価: {}".format(
             self.__name,
             latest_score.number_of_corrects,
             latest_score.number_of_incorrects,
             latest_score.grade
         )
+        # 計測した時間があれば、中央値と90パーセンタイルを追加する
+        timings = [
+            ("初回入力", latest_score.first_key_times, "秒"),
+            ("解答時間", latest_score.submit_times, "秒"),
+            ("打鍵速度", latest_score.keystrokes_per_second, "回/秒"),
+            ("判定時間", latest_score.judge_latencies, "秒"),
+        ]
+        for label, values, unit in timings:
+            if values:
+                result += "\n{}: {:.2f}{} (90%: {:.2f})".format(
+                    label, percentile(values, 50), unit, percentile(values, 90)
+                )
+        return result
 
     @property
     def name(self) -> str:
@@ -0,0 +1,176 @@
+"""
+ボキャブラリーゲームの単語ファイル(csv)を、バイナリの単語帳にコンパイルして読むモジュール
+
+単語帳のフォーマット(数値はすべてリトルエンディアンの符号なし32bit整数)
+    ヘッダ: マジックナンバーb"WBNK", 単語数n
+    索引: 単語ごとのデータ部の開始位置 n + 1個(最後はデータ部の終端)
+    データ部: 単語ごとに「問題\\0答え\\0説明」をUTF-8にしたもの
+索引を引けば、ファイル全体を読まずに任意の行をO(1)で取り出せる
+
+    $ python -m game.word_bank game/words.csv
+等のコマンドで、csvと同じ場所に拡張子.binの単語帳を作成できる
+
+開いた単語帳はWordBankRegistryでプロセス全体に共有され、csvが更新されると開きなおされる
+"""
+
+
+import csv
+import mmap
+import os
+import struct
+import sys
+from threading import Lock
+from typing import Dict, List, NamedTuple, Tuple
+
+MAGIC = b"WBNK"
+HEADER = struct.Struct("<4sI")  # マジックナンバーと単語数
+OFFSET = struct.Struct("<I")  # 索引の1要素
+OFFSET_PAIR = struct.Struct("<II")  # 単語の開始位置と終了位置
+SEPARATOR = "\0"  # 問題、答え、説明の区切り文字
+
+
+class Word(NamedTuple):
+    """単語帳の1行分を格納する名前付きタプル"""
+
+    question: str  # 出題する単語
+    answer: str  # 答え
+    description: str  # 単語の説明
+
+
+def bank_path_of(csv_path: str) -> str:
+    """csvファイルに対応する単語帳のパスを返す関数"""
+    return os.path.splitext(csv_path)[0] + ".bin"
+
+
+def build(csv_path: str, bank_path: str, encoding: str = "shift_jis") -> int:
+    """
+    csvファイルcsv_pathをコンパイルして単語帳bank_pathを作成する関数
+    書き込み中のファイルを読まれないように、一時ファイルに書いてから置き換える
+    どのcsvから作成したかわかるように、単語帳の更新日時はcsvと同じにする
+    単語数を返す
+    """
+    csv_stat = os.stat(csv_path)
+    records: List[bytes] = []
+    with open(csv_path, mode="r", encoding=encoding) as f:
+        for row in csv.reader(f):
+            if len(row) < 3:  # 空行などは読み飛ばす
+                continue
+            records.append(SEPARATOR.join(row[:3]).encode("utf-8"))
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    tmp_path = bank_path + ".tmp"
+    with open(tmp_path, mode="wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        f.write(struct.pack("<{}I".format(len(offsets)), *offsets))
+        f.write(b"".join(records))
+    os.utime(tmp_path, ns=(csv_stat.st_atime_ns, csv_stat.st_mtime_ns))
+    os.replace(tmp_path, bank_path)
+    return len(records)
+
+
+class WordBank:
+    """
+    単語帳をメモリマップして読むクラス
+    インスタンス化時に一度だけファイルを開き、行はアクセスされたときにだけデコードする
+    """
+
+    def __init__(self, bank_path: str) -> None:
+        with open(bank_path, mode="rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.__length = HEADER.unpack_from(self.__map, 0)
+        if magic != MAGIC:
+            raise ValueError("単語帳のファイルではありません: " + bank_path)
+        self.__index_start = HEADER.size  # 索引の開始位置
+        # データ部の開始位置
+        self.__data_start = self.__index_start + OFFSET.size * (self.__length + 1)
+
+    @classmethod
+    def open(cls, csv_path: str) -> "WordBank":
+        """
+        csvファイルに対応する単語帳を開くクラスメソッド
+        単語帳がない、もしくはcsvファイルと更新日時が異なる場合は作成しなおしてから開く
+        """
+        bank_path = bank_path_of(csv_path)
+        if not os.path.exists(bank_path) or os.stat(
+            bank_path
+        ).st_mtime_ns != os.stat(csv_path).st_mtime_ns:
+            build(csv_path, bank_path)
+        return cls(bank_path)
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __getitem__(self, i: int) -> Word:
+        """i番目の単語を返す"""
+        if not 0 <= i < self.__length:
+            raise IndexError("単語帳の範囲外です")
+        start, end = OFFSET_PAIR.unpack_from(
+            self.__map, self.__index_start + OFFSET.size * i
+        )
+        record = self.__map[self.__data_start + start : self.__data_start + end]
+        return Word(*record.decode("utf-8").split(SEPARATOR))
+
+    def close(self) -> None:
+        """メモリマップを閉じるメソッド"""
+        self.__map.close()
+
+
+class WordBankRegistry:
+    """
+    開いた単語帳をcsvファイルのパスごとに共有するクラス
+    単語帳は最初に使われたときに開き、csvファイルの更新日時が変わっていれば開きなおす
+    単語帳は読み込み専用なので、複数のゲームから同時に使ってもよい
+    単語(行番号)ごとの不正解数もここで持つので、ゲームをまたいで使える
+    """
+
+    def __init__(self) -> None:
+        # csvファイルのパスと、(開いたときのcsvの更新日時, 単語帳)の辞書
+        self.__banks: Dict[str, Tuple[int, WordBank]] = {}
+        # csvファイルのパスと、{行番号: 不正解数}の辞書
+        self.__misses: Dict[str, Dict[int, int]] = {}
+        self.__lock = Lock()  # 同じ単語帳を同時に開かないように排他する
+
+    def get(self, csv_path: str) -> WordBank:
+        """csvファイルcsv_pathに対応する単語帳を返すメソッド"""
+        csv_path = os.path.abspath(csv_path)
+        mtime = os.stat(csv_path).st_mtime_ns
+        loaded = self.__banks.get(csv_path)
+        if loaded is not None and loaded[0] == mtime:
+            return loaded[1]
+        with self.__lock:
+            loaded = self.__banks.get(csv_path)
+            if loaded is None or loaded[0] != mtime:
+                # 古い単語帳は使用中かもしれないので閉じずに手放す
+                loaded = (mtime, WordBank.open(csv_path))
+                self.__banks[csv_path] = loaded
+                # 行番号が変わっているかもしれないので、不正解数も数えなおす
+                self.__misses.pop(csv_path, None)
+        return loaded[1]
+
+    def miss(self, csv_path: str, i: int) -> None:
+        """csvファイルcsv_pathのi行目の単語が不正解だったことを記録するメソッド"""
+        csv_path = os.path.abspath(csv_path)
+        with self.__lock:
+            misses = self.__misses.setdefault(csv_path, {})
+            misses[i] = misses.get(i, 0) + 1
+
+    def misses(self, csv_path: str) -> Dict[int, int]:
+        """csvファイルcsv_pathの{行番号: 不正解数}の辞書(のコピー)を返すメソッド"""
+        with self.__lock:
+            return dict(self.__misses.get(os.path.abspath(csv_path), {}))
+
+    def clear(self) -> None:
+        """共有している単語帳と不正解数を手放すメソッド"""
+        with self.__lock:
+            self.__banks.clear()
+            self.__misses.clear()
+
+
+registry = WordBankRegistry()  # プロセス全体で共有する単語帳
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        number_of_words = build(path, bank_path_of(path))
+        print("{}: {}語".format(bank_path_of(path), number_of_words))
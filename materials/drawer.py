@@ -1,46 +1,185 @@
+import os
 import sys
 import textwrap
-from time import sleep
+import time
+from collections import OrderedDict
+from typing import NamedTuple
 
 import pygame
 from pygame.locals import *
 
 from .align import Align  # オブジェクトの配置に関するモジュール
 from .colors import Color  # 色に関するモジュール
+from .scheduler import FrameScheduler  # フレームの時間に関するモジュール
 from .text import Text # テキストに関するモジュール
 
 
+class CacheInfo(NamedTuple):
+    """SurfaceCacheの統計情報を格納する名前付きタプル"""
+
+    hits: int  # キャッシュにあった回数
+    misses: int  # キャッシュになかった回数
+    evictions: int  # 上限を超えたため追い出した回数
+    size: int  # 現在のキャッシュ数
+    maxsize: int  # キャッシュ数の上限
+
+    @property
+    def hit_rate(self) -> float:
+        """ヒット率を返すプロパティ"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# 日本語を描画できるフォントの候補(見つかった最初のものを使う)
+FONT_NAMES = ["yumincho", "notoserifcjkjp", "notosanscjkjp", "ipaexmincho", "ipamincho"]
+
+
+def find_font():
+    """
+    日本語を描画できるフォントのパスを返す関数
+    環境変数TYPING_GAME_FONTでフォントのファイルを指定でき、指定がなければFONT_NAMESから探す
+    見つからなければNone(Pygame付属のフォントになり、日本語は描画できない)
+    """
+    return os.environ.get("TYPING_GAME_FONT") or pygame.font.match_font(FONT_NAMES)
+
+
+class InputTiming(NamedTuple):
+    """input_textで計測した入力の時間を格納する名前付きタプル"""
+
+    first_key: float  # 入力開始から最初のキー入力までの時間(秒)
+    submit: float  # 入力開始からエンターキー押下までの時間(秒)
+    keystrokes: int  # キー入力の回数
+
+
+class SurfaceCache:
+    """
+    font.renderで描画した文字のSurfaceを、最も長く使われていないものから追い出すキャッシュ
+    (フォント, 文字, アンチエイリアス, 色)をキーにする
+    Surfaceはblitで貼り付けるだけで書き換えないので、使い回してよい
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.__surfaces = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def render(self, font, text, antialias, color):
+        """font.renderの結果を返すメソッド(キャッシュにあればそれを返す)"""
+        key = (font, text, antialias, color)
+        surface = self.__surfaces.get(key)
+        if surface is not None:
+            self.__hits += 1
+            self.__surfaces.move_to_end(key)  # 最近使われたものとして末尾に移動する
+            return surface
+        self.__misses += 1
+        surface = font.render(text, antialias, color)
+        if self.maxsize > 0:
+            self.__surfaces[key] = surface
+            if len(self.__surfaces) > self.maxsize:
+                self.__surfaces.popitem(last=False)  # 最も古いものを追い出す
+                self.__evictions += 1
+        return surface
+
+    def clear(self):
+        """キャッシュと統計情報を空にするメソッド"""
+        self.__surfaces.clear()
+        self.__hits = self.__misses = self.__evictions = 0
+
+    @property
+    def info(self):
+        """統計情報を返すプロパティ"""
+        return CacheInfo(
+            self.__hits,
+            self.__misses,
+            self.__evictions,
+            len(self.__surfaces),
+            self.maxsize,
+        )
+
+
 class Drawer:
-    def __init__(self):
-        pygame.init()  # Pygame初期化
+    def __init__(self, headless=False):
+        """
+        headlessがTrueのときはウィンドウを開かず、オフスクリーンのSurfaceに描画する
+        (ディスプレイのない環境でのテストや計測に使う)
+        """
+        self.headless = headless
+        if headless:
+            # 使用可能なビデオデバイスがなくても初期化できるように、初期化の間だけダミーのドライバを使う
+            # (プロセス全体の環境変数は書き換えたままにしない)
+            driver = os.environ.get("SDL_VIDEODRIVER")
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            try:
+                pygame.init()  # Pygame初期化
+            finally:
+                if driver is None:
+                    del os.environ["SDL_VIDEODRIVER"]
+                else:
+                    os.environ["SDL_VIDEODRIVER"] = driver
+        else:
+            pygame.init()  # Pygame初期化
         self.width, self.height = (800, 600)
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        self.font_small = pygame.font.SysFont("yumincho", 15)
-        self.font_medium = pygame.font.SysFont("yumincho", 30)
-        self.font_large = pygame.font.SysFont("yumincho", 60)
+        if headless:
+            self.screen = pygame.Surface((self.width, self.height))
+        else:
+            self.screen = pygame.display.set_mode((self.width, self.height))
+        # ヘッドレスでも日本語の描画を計測できるように、ウィンドウと同じフォントを使う
+        self.font_path = find_font()
+        self.font_small = pygame.font.Font(self.font_path, 15)
+        self.font_medium = pygame.font.Font(self.font_path, 30)
+        self.font_large = pygame.font.Font(self.font_path, 60)
+        self.text_cache = SurfaceCache()  # 描画した文字のキャッシュ
+        self.dirty_rects = []  # 前回の画面更新から描画された領域のリスト
+
+    def render(self, font, text, color=Color.BLACK.rgb):
+        """文字をアンチエイリアスありで描画したSurfaceを返すメソッド"""
+        return self.text_cache.render(font, text, True, color)
+
+    def mark(self, rect):
+        """描画した領域rectを、次の画面更新で更新する領域として記録するメソッド"""
+        self.dirty_rects.append(rect)
+        return rect
+
+    def fill(self, color=Color.WAKATAKE.rgb, rect=None):
+        """rect(指定しなければ画面全体)を塗りつぶすメソッド"""
+        return self.mark(self.screen.fill(color, rect))
+
+    def update(self):
+        """描画された領域だけ画面を更新するメソッド"""
+        if not self.headless:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
 
     def make_header(self, text, height_correction=0):
         """
         ヘッダーを表示するメソッド
         height_correctionで表示するy座標を補正できる
         """
-        text_surface = self.font_large.render(text, True, Color.BLACK.rgb)
+        text_surface = self.render(self.font_large, text)
         align = Align(text_surface, self.width, self.height)
         used_height = height_correction + align.middle() - text_surface.get_height() * 2
-        self.screen.blit(text_surface, [align.center(), used_height])
+        self.mark(self.screen.blit(text_surface, [align.center(), used_height]))
         return used_height
 
     def make_header_outline(self):
         """ヘッダーの枠を表示するメソッド"""
         top_start_pos, top_end_pos = (100, 100), (700, 100)
         bottom_start_pos, bottom_end_pos = (100, 220), (700, 220)
-        pygame.draw.line(self.screen, Color.BLUE.rgb, top_start_pos, top_end_pos)
-        pygame.draw.line(self.screen, Color.BLUE.rgb, bottom_start_pos, bottom_end_pos)
+        self.mark(
+            pygame.draw.line(self.screen, Color.BLUE.rgb, top_start_pos, top_end_pos)
+        )
+        self.mark(
+            pygame.draw.line(
+                self.screen, Color.BLUE.rgb, bottom_start_pos, bottom_end_pos
+            )
+        )
 
     def make_header_underline(self):
         """ヘッダーのアンダーラインを表示するメソッド"""
         start_pos, end_pos = (100, 110), (700, 110)
-        pygame.draw.line(self.screen, Color.BLACK.rgb, start_pos, end_pos)
+        self.mark(pygame.draw.line(self.screen, Color.BLACK.rgb, start_pos, end_pos))
 
     def make_subheader(self, text_list, height_correction=0, focus_index=None):
         """
@@ -48,47 +187,97 @@ class Drawer:
         各小見出しをリストで貰う
         """
         for i, text in enumerate(text_list):
-            text_surface = self.font_medium.render(text, True, Color.BLACK.rgb)
+            text_surface = self.render(self.font_medium, text)
             align = Align(text_surface, self.width, self.height)
             used_height = align.middle() + text_surface.get_height() * i
             if i == focus_index:
-                pygame.draw.rect(
-                    self.screen,
-                    Color.TEAL.rgb,
-                    Rect(
-                        align.center(),
-                        used_height,
-                        text_surface.get_width(),
-                        text_surface.get_height(),
-                    ),
+                self.mark(
+                    pygame.draw.rect(
+                        self.screen,
+                        Color.TEAL.rgb,
+                        Rect(
+                            align.center(),
+                            used_height,
+                            text_surface.get_width(),
+                            text_surface.get_height(),
+                        ),
+                    )
+                )
+            self.mark(
+                self.screen.blit(
+                    text_surface, [align.center(), used_height + height_correction]
+                )
+            )
+
+    def fill_subheader(self, text_list, height_correction=0):
+        """
+        make_subheaderで小見出しを表示した行を塗りつぶすメソッド
+        フォーカスの位置だけが変わったときに、画面全体を描画しなおさないために使う
+        """
+        for i, text in enumerate(text_list):
+            text_surface = self.render(self.font_medium, text)
+            align = Align(text_surface, self.width, self.height)
+            used_height = align.middle() + text_surface.get_height() * i
+            for y in {used_height, used_height + height_correction}:
+                self.fill(
+                    Color.WAKATAKE.rgb,
+                    (0, y, self.width, text_surface.get_height()),
+                )
+
+    def make_lines(self, text_list, top, bottom):
+        """
+        text_listの各行を、y座標がtopからbottomまでの間に収まるように上下中央に表示するメソッド
+        中くらいの文字で収まらなければ小さい文字にする
+        描画した領域のリストを返す
+        """
+        font = self.font_medium
+        if font.get_height() * len(text_list) > bottom - top:
+            font = self.font_small
+        line_height = font.get_height()
+        used_height = top + max(bottom - top - line_height * len(text_list), 0) // 2
+        rects = []
+        for i, text in enumerate(text_list):
+            text_surface = self.render(font, text)
+            align = Align(text_surface, self.width, self.height)
+            rects.append(
+                self.mark(
+                    self.screen.blit(
+                        text_surface, [align.center(), used_height + line_height * i]
+                    )
                 )
-            self.screen.blit(
-                text_surface, [align.center(), used_height + height_correction]
             )
+        return rects
 
     def make_top_left_subheader(self, text):
         """画面右上に文字を表示するメソッド"""
-        text_surface = self.font_medium.render(text, True, Color.BLACK.rgb)
+        text_surface = self.render(self.font_medium, text)
         align = Align(text_surface, self.width, self.height)
-        self.screen.blit(text_surface, [align.left() + 10, align.top() + 10])
+        self.mark(
+            self.screen.blit(text_surface, [align.left() + 10, align.top() + 10])
+        )
 
     def make_top_right_subheader(self, text):
         """画面左上に文字を表示するメソッド"""
-        text_surface = self.font_medium.render(text, True, Color.BLACK.rgb)
+        text_surface = self.render(self.font_medium, text)
         align = Align(text_surface, self.width, self.height)
-        self.screen.blit(text_surface, [align.right() - 10, align.top() + 10])
+        self.mark(
+            self.screen.blit(text_surface, [align.right() - 10, align.top() + 10])
+        )
 
     def make_bottom_subheader(self, text, color=Color.RED.rgb):
-        """画面中央下に文字を表示するメソッド"""
-        text_surface = self.font_medium.render(text, True, color)
+        """画面中央下に文字を表示し、描画した領域を返すメソッド"""
+        text_surface = self.render(self.font_medium, text, color)
         align = Align(text_surface, self.width, self.height)
-        self.screen.blit(
-            text_surface, [align.center(), align.bottom() - text_surface.get_height()]
+        return self.mark(
+            self.screen.blit(
+                text_surface,
+                [align.center(), align.bottom() - text_surface.get_height()],
+            )
         )
 
     def fill_bottom_subheader(self):
         """画面中央下を塗りつぶすメソッド"""
-        self.screen.fill(
+        self.fill(
             Color.WAKATAKE.rgb,
             (0, self.height - 40 * 2, self.width, 45),
         )
@@ -97,8 +286,8 @@ class Drawer:
         """
         入力文字を表示するためのメソッド
         """
-        text_surface = self.font_medium.render(text, True, Color.BLACK.rgb)
-        self.screen.fill(
+        text_surface = self.render(self.font_medium, text)
+        self.fill(
             Color.WAKATAKE.rgb,
             (
                 0,
@@ -107,12 +296,14 @@ class Drawer:
                 text_surface.get_height(),
             ),
         )
-        self.screen.blit(
-            text_surface,
-            [
-                ((self.width / 2) - (text_surface.get_width() / 2)),
-                (self.height - text_surface.get_height() * 2),
-            ],
+        self.mark(
+            self.screen.blit(
+                text_surface,
+                [
+                    ((self.width / 2) - (text_surface.get_width() / 2)),
+                    (self.height - text_surface.get_height() * 2),
+                ],
+            )
         )
 
 
@@ -121,55 +312,76 @@ class StateDraw(Drawer):
     状態に応じた画面を描画をするためのクラス
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, headless=False, scheduler=None) -> None:
+        """schedulerを指定すると、そこからイベントを受け取る(記録や再現に使う)"""
+        super().__init__(headless)
         pygame.key.stop_text_input()  # input, editingイベントを止める
+        self.current_screen = None  # 描画中の画面のキャプション
+        # フレームレートとイベント待ちを管理する
+        self.scheduler = scheduler if scheduler is not None else FrameScheduler()
+        self.input_timing = None  # 最後のinput_textで計測したInputTiming
+
+    def start_screen(self, caption, keep=False):
+        """
+        画面の描画を始めるメソッド
+        keepがTrueで、前回と同じ画面であれば何もせずFalseを返す
+        それ以外はキャプションを設定してウィンドウを塗りつぶし、Trueを返す
+        """
+        if keep and self.current_screen == caption:
+            return False
+        self.current_screen = caption
+        if not self.headless:
+            pygame.display.set_caption("タイピングゲーム | " + caption)  # キャプション設定
+        self.fill()  # ウィンドウを塗りつぶす
+        return True
 
     def title(self, focus_index) -> None:
         """タイトル画面"""
-        pygame.display.set_caption("タイピングゲーム | Title")  # キャプション設定
-        self.screen.fill(Color.WAKATAKE.rgb)  # ウィンドウを塗りつぶす
         # 画面に表示するテキストの設定
         title = "タイピングゲーム"
-        self.make_header(title)
-        self.make_header_outline()
         subheader_list = ["開始", "終了"]
+        if self.start_screen("Title", keep=True):
+            self.make_header(title)
+            self.make_header_outline()
+        else:  # フォーカスが動いただけなので、小見出しだけ描画しなおす
+            self.fill_subheader(subheader_list)
         self.make_subheader(subheader_list, 0, focus_index)
-        pygame.display.update()  # 画面更新
+        self.update()  # 画面更新
 
     def register(self):
         """ユーザー名入力画面"""
-        pygame.display.set_caption("タイピングゲーム | User")  # キャプション設定
-        self.screen.fill(Color.WAKATAKE.rgb)  # ウィンドウを塗りつぶす
+        self.start_screen("User")
         title = "ユーザー名入力"
         self.make_header(title)
         self.make_header_outline()
-        pygame.display.update()  # 画面更新
+        self.update()  # 画面更新
         user_name = self.input_text()  # 文字入力
         pygame.event.post(pygame.event.Event(USEREVENT))
         return user_name
 
     def choose_type(self, focus_index) -> None:
         """ゲーム選択画面"""
-        pygame.display.set_caption("タイピングゲーム | Type")  # キャプション設定
-        self.screen.fill(Color.WAKATAKE.rgb)  # ウィンドウを塗りつぶす
         # 画面に表示するテキストの設定
         title = "ゲーム選択"
-        self.make_header(title)
-        self.make_header_outline()
         subheader_list = ["ボキャブラリーゲーム", "しりとりゲーム"]
+        if self.start_screen("Type", keep=True):
+            self.make_header(title)
+            self.make_header_outline()
+        else:  # フォーカスが動いただけなので、小見出しだけ描画しなおす
+            self.fill_subheader(subheader_list)
         self.make_subheader(subheader_list, 0, focus_index)
-        pygame.display.update()  # 画面更新
+        self.update()  # 画面更新
 
     def choose_mode(self, game_modes_list, focus_index) -> None:
         """モード選択画面"""
-        pygame.display.set_caption("タイピングゲーム | Mode")  # キャプション設定
-        self.screen.fill(Color.WAKATAKE.rgb)  # ウィンドウを塗りつぶす
         title = "モード選択"
-        self.make_header(title)
-        self.make_header_outline()
+        if self.start_screen("Mode", keep=True):
+            self.make_header(title)
+            self.make_header_outline()
+        else:  # フォーカスが動いただけなので、小見出しだけ描画しなおす
+            self.fill_subheader(game_modes_list)
         self.make_subheader(game_modes_list, 0, focus_index)
-        pygame.display.update()  # 画面更新
+        self.update()  # 画面更新
 
     def play(self, mode_info, progress) -> None:
         """
@@ -177,41 +389,48 @@ class StateDraw(Drawer):
         しりとりの場合に出題する頭文字の取得に時間がかかるので、
         先に描画できるものは描画して、あとから出題する
         """
-        pygame.display.set_caption("タイピングゲーム | Play")  # キャプション設定
-        self.screen.fill(Color.WAKATAKE.rgb)  # ウィンドウを塗りつぶす
+        self.start_screen("Play")
         # 画面に表示するテキストの設定
         self.make_top_left_subheader(mode_info)
         self.make_top_right_subheader(progress)
-        pygame.display.update()  # 画面更新
+        self.update()  # 画面更新
         question = yield
         used_height = self.make_header(question.word, -80)  # 取得した単語の表示
         description_list = textwrap.wrap(question.describe, 18)  # 18字ごとに区切る
         self.make_subheader(description_list, -used_height * 3)  # 取得した説明の表示
         self.make_header_underline()
-        pygame.display.update()  # 画面更新
+        self.update()  # 画面更新
         judge = yield self.input_text()  # 入力を戻し、判定してもらう
         if not judge.correct:
             self.fill_bottom_subheader()  # 塗りつぶし
-            pygame.display.update()  # 画面更新
+            self.update()  # 画面更新
             self.make_bottom_subheader(judge.message)
-            pygame.display.update()  # 画面更新
-            sleep(2)  # 不正解時のメッセージを見せるために2秒待機
+            self.update()  # 画面更新
+            self.scheduler.sleep(2000)  # 不正解時のメッセージを見せるために2秒待機
 
     def input_text(self):
-        """テキスト入力をするメソッド"""
+        """
+        テキスト入力をするメソッド
+        入力にかかった時間はself.input_timingに格納する
+        """
+        started = time.perf_counter()  # 入力開始の時刻
+        first_key = None  # 最初のキー入力の時刻
+        keystrokes = 0  # キー入力の回数
         pygame.key.start_text_input()
         text = Text()  # Textクラスのインスタンス化
-        input_text = "|"
-        self.text_box(input_text)
-        pygame.display.update()
+        input_text = ""  # 確定した文字列
+        self.text_box(text.display)
+        self.update()
+        # 操作ごとには表示する文字列を作らず、描画するときにtext.displayで作る
         call_trigger = {
-            K_BACKSPACE: text.delete,
-            K_LEFT: text.move_cursor_left,
-            K_RIGHT: text.move_cursor_right,
+            K_BACKSPACE: text.delete_char,
+            K_LEFT: text.move_left,
+            K_RIGHT: text.move_right,
             K_RETURN : text.enter
         }
+        changed = False  # 描画されていない入力の有無
         while True:
-            event = pygame.event.poll()
+            event = self.scheduler.wait_event()  # イベントが来るまで待つ
             if event.type == NOEVENT:
                 continue
             if event.type == QUIT:
@@ -220,26 +439,60 @@ class StateDraw(Drawer):
             # 半角入力中(もしくは全角入力の確定時)の矢印もしくはエンターキー押下時の処理
             elif event.type == KEYDOWN and not text.is_editing:
                 if event.key in call_trigger.keys():
-                    input_text = call_trigger[event.key]()
+                    entered = call_trigger[event.key]()
+                    if event.key == K_RETURN:
+                        input_text = entered
                 if event.unicode in ("\r", "") and event.key == K_RETURN:
                     break
             elif event.type == TEXTEDITING:  # 全角入力するときに必ず真
-                input_text = text.edit(event.text, event.start)
+                text.set_editing(event.text, event.start)
             elif event.type == TEXTINPUT:  # 半角入力するときに必ず使う(もしくは全角時enter)
-                input_text = text.input(event.text)
+                text.insert_text(event.text)
             if event.type in [KEYDOWN, TEXTEDITING, TEXTINPUT]:
-                self.text_box(input_text) # 入力を描画
-                pygame.display.update()
+                changed = True
+                if first_key is None:
+                    first_key = time.perf_counter()
+                # 入力された文字数と、削除や矢印キーの押下をキー入力の回数とする
+                if event.type == TEXTINPUT:
+                    keystrokes += len(event.text)
+                elif event.type == KEYDOWN and event.key in call_trigger.keys():
+                    keystrokes += 1
+            # 溜まっている入力を処理し終えてから、1フレームに1回だけ描画する
+            if changed and not self.scheduler.pending():
+                self.text_box(text.display) # 入力を描画
+                self.update()
+                self.scheduler.tick()
+                changed = False
         pygame.key.stop_text_input() # input, editingイベントをキャッチしないようにする
+        submit = time.perf_counter()
+        self.input_timing = InputTiming(
+            (first_key if first_key is not None else submit) - started,
+            submit - started,
+            keystrokes,
+        )
         return input_text
 
+    def wait(self, future):
+        """
+        Futureの処理が終わるまで待つメソッド
+        待っている間もイベントを処理して、ウィンドウが固まらないようにする
+        (キー入力のイベントは後のinput_textで使うので取り除かない)
+        """
+        while not future.done():
+            if pygame.event.get(QUIT):
+                pygame.quit()  # Pygame終了
+                sys.exit(0)  # 処理終了
+            pygame.time.wait(10)
+        return future.result()
+
     def result(self, result):
         """リザルト画面"""
-        pygame.display.set_caption("タイピングゲーム | Result")  # キャプション設定
-        self.screen.fill(Color.WAKATAKE.rgb)  # ウィンドウを塗りつぶす
+        self.start_screen("Result")
         title = "リザルト"
         self.make_header(title)
         self.make_header_outline()
-        self.make_subheader(result)
-        self.make_bottom_subheader("Please press Enter...", Color.BLUE.rgb)
-        pygame.display.update()  # 画面更新
+        prompt = self.make_bottom_subheader("Please press Enter...", Color.BLUE.rgb)
+        # 計測した時間の行が増えても重ならないように、
+        # ヘッダーの枠の下(y=220)から下のメッセージの上までに行数から配置を決める
+        self.make_lines(result, 220, prompt.top)
+        self.update()  # 画面更新
@@ -0,0 +1,191 @@
+"""
+プレイ中のイベントを記録し、記録したものを流してプレイを再現するためのモジュール
+
+記録ファイルのフォーマット(数値はリトルエンディアン)
+    ヘッダ: マジックナンバーb"RPLY", 乱数のシード(符号なし64bit整数)
+    イベントごと: 前のイベントからの経過時間(ミリ秒, 符号なし32bit整数),
+                  イベントの種類(符号なし16bit整数), 属性の長さ(符号なし16bit整数),
+                  属性(使うものだけをJSONにしたUTF-8)
+"""
+
+
+import json
+import statistics
+import struct
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import pygame
+from pygame.locals import *
+
+from .scheduler import FrameScheduler
+
+MAGIC = b"RPLY"
+HEADER = struct.Struct("<4sQ")  # マジックナンバーと乱数のシード
+RECORD = struct.Struct("<IHH")  # 経過時間、イベントの種類、属性の長さ
+ATTRIBUTES = ("key", "unicode", "text", "start")  # 記録するイベントの属性
+
+
+class RecordedEvent(NamedTuple):
+    """記録されたイベント1つ分を格納する名前付きタプル"""
+
+    delay: int  # 前のイベントからの経過時間(ミリ秒)
+    type: int  # イベントの種類
+    attributes: dict  # イベントの属性
+
+
+class Recording(NamedTuple):
+    """記録ファイル1つ分を格納する名前付きタプル"""
+
+    seed: int  # 記録したときの乱数のシード
+    events: List[RecordedEvent]  # 記録されたイベントのリスト
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        """記録ファイルを読み込むクラスメソッド"""
+        with open(path, mode="rb") as f:
+            data = f.read()
+        magic, seed = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("記録ファイルではありません: " + path)
+        events = []
+        pos = HEADER.size
+        while pos < len(data):
+            delay, event_type, length = RECORD.unpack_from(data, pos)
+            pos += RECORD.size
+            attributes = json.loads(data[pos : pos + length].decode("utf-8"))
+            pos += length
+            events.append(RecordedEvent(delay, event_type, attributes))
+        return cls(seed, events)
+
+
+class RecordingScheduler(FrameScheduler):
+    """
+    受け取ったイベントを記録ファイルに書き込みながら、通常どおり処理するクラス
+    プレイ中にウィンドウを閉じても記録が残るように、イベントごとに書き込む
+    """
+
+    def __init__(self, path: str, seed: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.file = open(path, mode="wb")
+        self.file.write(HEADER.pack(MAGIC, seed))
+        self.last_time = time.perf_counter()  # 前のイベントを受け取った時刻
+
+    def record(self, events: List[pygame.event.Event]) -> None:
+        """イベントを記録ファイルに書き込むメソッド"""
+        for event in events:
+            if event.type == NOEVENT:
+                continue
+            now = time.perf_counter()
+            delay = int((now - self.last_time) * 1000)
+            self.last_time = now
+            attributes = {
+                k: getattr(event, k) for k in ATTRIBUTES if hasattr(event, k)
+            }
+            payload = json.dumps(attributes, ensure_ascii=False).encode("utf-8")
+            self.file.write(RECORD.pack(delay, event.type, len(payload)) + payload)
+        self.file.flush()
+
+    def wait_event(self, animating: bool = False) -> pygame.event.Event:
+        event = super().wait_event(animating)
+        self.record([event])
+        return event
+
+    def get_events(self, timeout: int = 0) -> List[pygame.event.Event]:
+        events = super().get_events(timeout)
+        self.record(events)
+        return events
+
+
+class ReplayFinished(Exception):
+    """記録されたイベントを流し終えたことを知らせる例外"""
+
+    pass
+
+
+class ReplayScheduler(FrameScheduler):
+    """
+    記録されたイベントを、実際のイベントの代わりに流すクラス
+    speed倍速で流し(0なら待たずに流す)、フレームレートの制限もしない
+    流し終えるか、ウィンドウを閉じるイベントに来るとReplayFinishedを送出する
+
+    label()で現在の状態の名前を返すようにしておくと、
+    イベントを受け取ってから次のイベントを要求するまでの処理時間を状態ごとに集計する
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        speed: float = 0.0,
+        label: Optional[Callable[[], str]] = None,
+    ) -> None:
+        super().__init__()
+        self.recording = recording
+        self.speed = speed
+        self.label = label
+        self.latencies: Dict[str, List[float]] = {}  # 状態の名前と処理時間(ミリ秒)のリスト
+        self.rewind()
+
+    def rewind(self) -> None:
+        """最初のイベントから流しなおすメソッド"""
+        self.position = 0  # 次に流すイベントの位置
+        self.due = time.perf_counter()  # 次のイベントを流す時刻
+        self.served: Optional[float] = None  # 前のイベントを流した時刻
+        self.served_label = ""  # 前のイベントを流したときの状態の名前
+
+    def measure(self) -> None:
+        """前のイベントを流してからの処理時間を、そのときの状態の処理時間として記録する"""
+        if self.served is not None and self.label is not None:
+            elapsed = (time.perf_counter() - self.served) * 1000
+            self.latencies.setdefault(self.served_label, []).append(elapsed)
+            self.served = None
+
+    def next_event(self) -> pygame.event.Event:
+        """次のイベントを、流す時刻まで待ってから返すメソッド"""
+        if self.position >= len(self.recording.events):
+            raise ReplayFinished()
+        recorded = self.recording.events[self.position]
+        if recorded.type == QUIT:
+            raise ReplayFinished()
+        self.position += 1
+        if self.speed > 0:
+            self.due += recorded.delay / 1000 / self.speed
+            wait = self.due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        self.served = time.perf_counter()
+        self.served_label = self.label() if self.label is not None else ""
+        return pygame.event.Event(recorded.type, recorded.attributes)
+
+    def tick(self) -> int:
+        return self.clock.tick()  # フレームレートの制限はしない
+
+    def wait_event(self, animating: bool = False) -> pygame.event.Event:
+        self.measure()
+        pygame.event.clear()  # プログラム内で積まれたイベントも記録に含まれている
+        return self.next_event()
+
+    def get_events(self, timeout: int = 0) -> List[pygame.event.Event]:
+        # 待たずに取り出すときは、描画が終わる前にイベントを流さないように何も返さない
+        if not timeout:
+            return []
+        self.measure()
+        pygame.event.clear()
+        return [self.next_event()]
+
+    def pending(self) -> bool:
+        return False
+
+    def sleep(self, ms: int) -> None:
+        if self.speed > 0:
+            time.sleep(ms / 1000 / self.speed)
+
+
+def percentiles(values: List[float]) -> str:
+    """処理時間のリストを、50/90/99パーセンタイルと最大値の文字列にする関数"""
+    if len(values) < 2:
+        values = values * 2
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return "p50={:.3f} p90={:.3f} p99={:.3f} max={:.3f}".format(
+        quantiles[49], quantiles[89], quantiles[98], max(values)
+    )
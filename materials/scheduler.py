@@ -0,0 +1,63 @@
+from typing import List
+
+import pygame
+from pygame.locals import *
+
+
+class FrameScheduler:
+    """
+    メインループや文字入力のループの、1フレームの時間を管理するクラス
+    描画するものがないときは、イベントが来るまで待つことでCPUを使わないようにする
+    イベントはすべてこのクラスを通して受け取るので、
+    サブクラスで記録したり、記録したものを流したりできる(replayモジュール)
+    """
+
+    def __init__(self, fps: int = 30, idle_timeout: int = 500) -> None:
+        """
+        fps: 目標のフレームレート
+        idle_timeout: イベントを待つ最大の時間(ミリ秒)
+        """
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.frame_budget = 1000 / fps  # 1フレームに使える時間(ミリ秒)
+        self.over_budget_frames = 0  # 処理時間がframe_budgetを超えたフレーム数
+        self.clock = pygame.time.Clock()
+
+    def tick(self) -> int:
+        """
+        フレームの最後に呼ぶメソッド
+        目標のフレームレートを超えないように待ち、前回のtickからの経過時間(ミリ秒)を返す
+        """
+        elapsed = self.clock.tick(self.fps)
+        # get_rawtimeはtick内で待った時間を除いた、フレームの処理時間
+        if self.clock.get_rawtime() > self.frame_budget:
+            self.over_budget_frames += 1
+        return elapsed
+
+    def wait_event(self, animating: bool = False) -> pygame.event.Event:
+        """
+        イベントを1つ取り出すメソッド
+        animatingがFalseであれば、イベントが来るまで最大idle_timeoutミリ秒待つ
+        イベントがなかったときはNOEVENTのイベントを返す
+        """
+        if animating:
+            return pygame.event.poll()
+        return pygame.event.wait(self.idle_timeout)
+
+    def get_events(self, timeout: int = 0) -> List[pygame.event.Event]:
+        """
+        溜まっているイベントをすべて取り出すメソッド
+        timeoutを指定すると、イベントがなければ最大timeoutミリ秒待つ
+        """
+        events = pygame.event.get()
+        if not events and timeout:
+            events = [pygame.event.wait(timeout)] + pygame.event.get()
+        return events
+
+    def pending(self) -> bool:
+        """処理されていない入力のイベントがあるかを返すメソッド"""
+        return pygame.event.peek([QUIT, KEYDOWN, TEXTEDITING, TEXTINPUT])
+
+    def sleep(self, ms: int) -> None:
+        """msミリ秒待つメソッド(メッセージを見せるときなどに使う)"""
+        pygame.time.wait(ms)
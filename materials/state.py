@@ -8,11 +8,13 @@ import itertools
 import sys
 import typing
 from enum import Enum
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 
 import pygame
 from pygame.locals import *  # 定数読み込み
 
+from .scheduler import FrameScheduler  # イベントの受け取りに関するモジュール
+
 
 class States(Enum):
     """状態の定義"""
@@ -35,7 +37,9 @@ class TupleState(NamedTuple):
 class State:
     """状態遷移を管理するクラス"""
 
-    def __init__(self) -> None:
+    def __init__(self, scheduler: Optional[FrameScheduler] = None) -> None:
+        """schedulerを指定すると、そこからイベントを受け取る(描画側と共有するため)"""
+        self.scheduler = scheduler if scheduler is not None else FrameScheduler()
         self.is_running = False  # 状態遷移の有無によって画面の更新をするかどうかに使う
         self.state = None  # TupleStatesを格納する変数
         self.states = [
@@ -59,9 +63,12 @@ class State:
         self.selector = SelectorFocus(self.state.number_of_choices)
         self.is_running = False  # 再描画の必要を知らせる
 
-    def event(self) -> None:
-        """キーダウンに応じた状態の遷移を管理するメソッド"""
-        for event in pygame.event.get():
+    def event(self, timeout: int = 0) -> None:
+        """
+        キーダウンに応じた状態の遷移を管理するメソッド
+        timeoutを指定すると、イベントがなければ最大timeoutミリ秒待つ
+        """
+        for event in self.scheduler.get_events(timeout):
             if event.type == QUIT:  # 閉じるボタン押下
                 pygame.quit()  # Pygame終了(ウィンドウを閉じる)
                 sys.exit(0)  # 処理終了
@@ -1,92 +1,230 @@
-from typing import List
+from typing import List, Optional
 
 
 class Text:
     """
     PygameのINPUT、EDITINGイベントで使うクラス
     カーソル操作や文字列処理に使う
+
+    入力されたテキストはギャップバッファで持つ
+    バッファの中のギャップ(空き領域)の開始位置が表示するカーソルの位置になるので、
+    カーソル位置への追加や削除は、ギャップを埋めたり広げたりするだけで済む
+    表示する文字列は、カーソルより前、カーソル位置、カーソルより後ろの3つに分けて持ち、
+    操作で変わった部分だけを作りなおす(編集中の文字列が変わっても前後は作りなおさない)
     """
 
-    def __init__(self) -> None:
-        self.text = ["|"]  # 入力されたテキストを格納していく変数
+    cursor = "|"  # 表示するカーソル
+
+    def __init__(self, capacity: int = 16) -> None:
         self.editing: List[str] = []  # 全角の文字編集中(変換前)の文字を格納するための変数
         self.is_editing = False  # 編集中文字列の有無(全角入力時に使用)
-        self.cursor_pos = 0  # 文字入力のカーソル(パイプ|)の位置
+        self.__buffer = [""] * capacity  # 入力されたテキストを格納していくバッファ
+        self.__gap_start = 0  # ギャップの開始位置(表示するカーソルの位置)
+        self.__gap_end = capacity  # ギャップの終了位置
+        # 文字を追加する位置(カーソルを含めた表示上の位置)
+        # 普段はギャップの開始位置と同じで、cursor_posに代入されたときだけずれる
+        self.__cursor_pos = 0
+        self.__composition = Text.cursor  # カーソル位置に表示するもの(編集中の文字列)
+        # カーソルより前と後ろの文字列(Noneなら作りなおす)
+        self.__before: Optional[str] = ""
+        self.__after: Optional[str] = ""
 
     def __str__(self) -> str:
-        """self.textリストを文字列にして返す"""
-        return "".join(self.text)
+        """カーソルを含めたテキストを文字列にして返す"""
+        return self.join(Text.cursor)
 
-    def edit(self, text: str, editing_cursor_pos: int) -> str:
+    def __len__(self) -> int:
+        """入力されたテキストの文字数を返す"""
+        return len(self.__buffer) - (self.__gap_end - self.__gap_start)
+
+    def join(self, middle: str) -> str:
+        """カーソルより前のテキスト、middle、カーソルより後ろのテキストをつないで返すメソッド"""
+        if self.__before is None:
+            self.__before = "".join(self.__buffer[: self.__gap_start])
+        if self.__after is None:
+            self.__after = "".join(self.__buffer[self.__gap_end :])
+        return self.__before + middle + self.__after
+
+    @property
+    def display(self) -> str:
+        """表示する文字列(編集中であれば、カーソルの代わりに編集中の文字列を含む)を返すプロパティ"""
+        return self.join(self.__composition)
+
+    @property
+    def cursor_pos(self) -> int:
+        """文字を追加する位置(カーソルを含めた位置)を返すプロパティ"""
+        return self.__cursor_pos
+
+    @cursor_pos.setter
+    def cursor_pos(self, pos: int) -> None:
         """
-        edit(編集中)であるときに呼ばれるメソッド
-        全角かつ漢字変換前の確定していないときに呼ばれる
+        文字を追加する位置のsetter
+        表示されるカーソルは動かさない(カーソル自体はmove_cursorメソッドで動かす)
+        """
+        self.__cursor_pos = max(0, min(pos, len(self) + 1))  # カーソルの分も含める
+
+    def text_index(self, pos: int) -> int:
+        """カーソルを含めた位置posを、入力されたテキストの位置にして返すメソッド"""
+        return pos if pos <= self.__gap_start else pos - 1
+
+    def move_gap(self, index: int) -> None:
+        """ギャップをテキストの位置indexまで移動するメソッド"""
+        if index < self.__gap_start:  # カーソルより前の文字をギャップの後ろに移す
+            n = self.__gap_start - index
+            self.__buffer[self.__gap_end - n : self.__gap_end] = self.__buffer[
+                index : self.__gap_start
+            ]
+            self.__gap_start -= n
+            self.__gap_end -= n
+        elif index > self.__gap_start:  # カーソルより後ろの文字をギャップの前に移す
+            n = index - self.__gap_start
+            self.__buffer[self.__gap_start : index] = self.__buffer[
+                self.__gap_end : self.__gap_end + n
+            ]
+            self.__gap_start += n
+            self.__gap_end += n
+        else:
+            return
+        self.__before = self.__after = None
+
+    def sync_cursor(self) -> None:
+        """
+        cursor_posに代入されていれば、表示するカーソルをその位置に動かすメソッド
+        カーソルを動かす操作や削除は、文字を追加する位置から行う
+        """
+        if self.__cursor_pos != self.__gap_start:
+            self.move_gap(self.text_index(self.__cursor_pos))
+            self.__cursor_pos = self.__gap_start
+
+    def grow(self, size: int) -> None:
+        """ギャップがsize文字以上になるように、バッファを広げるメソッド"""
+        gap = self.__gap_end - self.__gap_start
+        if gap >= size:
+            return
+        # 何度も広げなくて済むように、倍の大きさにする
+        extend = max(size - gap, len(self.__buffer))
+        self.__buffer[self.__gap_end : self.__gap_end] = [""] * extend
+        self.__gap_end += extend
+
+    def set_editing(self, text: str, editing_cursor_pos: int) -> None:
+        """
+        編集中(全角かつ漢字変換前の確定していない)の文字列を、カーソル位置に表示するものにするメソッド
         """
         if text:  # テキストがあるなら
             self.is_editing = True
             for x in text:
                 self.editing.append(x)  # 編集中の文字列をリストに格納していく
             self.editing.insert(editing_cursor_pos, "|")  # カーソル位置にカーソルを追加
-            disp = "[" + "".join(self.editing) + "]"
+            self.__composition = "[" + "".join(self.editing) + "]"
         else:
             self.is_editing = False  # テキストが空の時はFalse
-            disp = "|"
+            self.__composition = Text.cursor
         self.editing = []  # 次のeditで使うために空にする
-        # self.cursorを読み飛ばして結合する
-        return (
-            format(self)[0 : self.cursor_pos]
-            + disp
-            + format(self)[self.cursor_pos + 1 :]
-        )
+
+    def insert_gap(self, text: str) -> None:
+        """ギャップの位置にテキストを追加するメソッド"""
+        self.grow(len(text))
+        self.__buffer[self.__gap_start : self.__gap_start + len(text)] = list(text)
+        self.__gap_start += len(text)
+        if self.__before is not None:
+            self.__before += text
+
+    def insert_text(self, text: str) -> None:
+        """文字を追加する位置にテキストを追加し、その分追加する位置を後ろにずらすメソッド"""
+        self.is_editing = False  # 編集中ではなくなったのでFalseにする
+        self.__composition = Text.cursor
+        if self.__cursor_pos == self.__gap_start:  # 普段はカーソル位置に追加する
+            self.insert_gap(text)
+            self.__cursor_pos = self.__gap_start
+            return
+        # cursor_posに代入されていれば、表示されるカーソルは動かさずにその位置に追加する
+        cursor = self.__gap_start
+        index = self.text_index(self.__cursor_pos)
+        self.move_gap(index)
+        self.insert_gap(text)
+        if index < cursor:  # カーソルより前に追加したので、カーソルも後ろにずれる
+            self.move_gap(cursor + len(text))
+            self.__cursor_pos = index + len(text)
+        else:
+            self.move_gap(cursor)
+            self.__cursor_pos = index + len(text) + 1
+
+    def delete_char(self) -> None:
+        """カーソルの前の1文字を削除するメソッド"""
+        self.sync_cursor()
+        if self.__gap_start > 0:  # カーソルより前に文字があるとき
+            self.__gap_start -= 1  # カーソル位置の一個前をギャップに含める
+            self.__cursor_pos = self.__gap_start
+            if self.__before is not None:
+                self.__before = self.__before[:-1]
+
+    def move_left(self) -> None:
+        """カーソルを左に動かすメソッド"""
+        self.sync_cursor()
+        if self.__gap_start > 0:
+            # カーソルの前の文字をギャップの後ろに移す
+            self.__gap_start -= 1
+            self.__gap_end -= 1
+            x = self.__buffer[self.__gap_end] = self.__buffer[self.__gap_start]
+            self.__cursor_pos = self.__gap_start
+            if self.__before is not None:
+                self.__before = self.__before[:-1]
+            if self.__after is not None:
+                self.__after = x + self.__after
+
+    def move_right(self) -> None:
+        """カーソルを右に動かすメソッド"""
+        self.sync_cursor()
+        if self.__gap_end < len(self.__buffer):
+            # カーソルの後ろの文字をギャップの前に移す
+            x = self.__buffer[self.__gap_start] = self.__buffer[self.__gap_end]
+            self.__gap_start += 1
+            self.__gap_end += 1
+            self.__cursor_pos = self.__gap_start
+            if self.__before is not None:
+                self.__before += x
+            if self.__after is not None:
+                self.__after = self.__after[1:]
+
+    def edit(self, text: str, editing_cursor_pos: int) -> str:
+        """
+        edit(編集中)であるときに呼ばれるメソッド
+        全角かつ漢字変換前の確定していないときに呼ばれる
+        """
+        self.set_editing(text, editing_cursor_pos)
+        # カーソルの代わりに編集中の文字列を表示する
+        return self.display
 
     def input(self, text: str) -> str:
         """
         半角文字が打たれたとき、もしくは全角で変換が確定したときに呼ばれるメソッド
         """
-        self.is_editing = False  # 編集中ではなくなったのでFalseにする
-        for x in text:
-            self.text.insert(self.cursor_pos, x)  # カーソル位置にテキストを追加
-            # 現在のカーソル位置にテキストを追加したので、カーソル位置を後ろにずらす
-            self.cursor_pos += 1
+        self.insert_text(text)
         return format(self)
 
     def delete(self) -> str:
         """
         確定している文字(半角なら文字入力後、全角なら変換確定後)を削除するためのメソッド
         """
-        if len(self.text) > 1:  # 1より大きいとき(カーソルを消さない)
-            self.text.pop(self.cursor_pos - 1)  # カーソル位置の一個前を消す
-            self.cursor_pos -= 1  # カーソル位置を前にずらす
+        self.delete_char()
         return format(self)
 
     def enter(self) -> str:
         """入力文字が確定したときに呼ばれるメソッド"""
-        # カーソルを読み飛ばす
-        entered = (
-            format(self)[0 : self.cursor_pos] + format(self)[self.cursor_pos + 1 :]
-        )
-        self.text = ["|"]  # 次回の入力で使うためにself.textを空にする
-        self.cursor_pos = 0  # self.text[0] == "|"となる
+        entered = self.join("")  # カーソルを読み飛ばす
+        # 次回の入力で使うために空にする
+        self.__gap_start = self.__cursor_pos = 0
+        self.__gap_end = len(self.__buffer)
+        self.__composition = Text.cursor
+        self.__before = self.__after = ""
         return entered
 
     def move_cursor_left(self) -> str:
         """inputされた文字のカーソル(パイプ|)の位置を左に動かすメソッド"""
-        if self.cursor_pos > 0:
-            # カーソル位置をカーソル位置の前の文字と交換する
-            self.text[self.cursor_pos], self.text[self.cursor_pos - 1] = (
-                self.text[self.cursor_pos - 1],
-                self.text[self.cursor_pos],
-            )
-            self.cursor_pos -= 1  # カーソルが1つ前に行ったのでデクリメント
+        self.move_left()
         return format(self)
 
     def move_cursor_right(self) -> str:
         """inputされた文字のカーソル(パイプ|)の位置を右に動かすメソッド"""
-        if len(self.text) - 1 > self.cursor_pos:
-            # カーソル位置をカーソル位置の後ろの文字と交換する
-            self.text[self.cursor_pos], self.text[self.cursor_pos + 1] = (
-                self.text[self.cursor_pos + 1],
-                self.text[self.cursor_pos],
-            )
-            self.cursor_pos += 1  # カーソルが1つ後ろに行ったのでインクリメント
+        self.move_right()
         return format(self)
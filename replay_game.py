@@ -0,0 +1,55 @@
+"""
+typing_game.pyで記録したプレイ(イベントとその間隔)を流して、ゲーム全体の処理性能を計測するスクリプト
+    $ python typing_game.py --record session.rpl
+で記録し、
+    $ python replay_game.py session.rpl --repeat 10
+等のコマンドで再現する
+ウィンドウは開かず(ヘッドレス)、--speedを指定しなければ待たずに流す
+"""
+
+
+import argparse
+import random
+import time
+
+import typing_game
+from game.user import User
+from materials.drawer import StateDraw
+from materials.replay import Recording, ReplayFinished, ReplayScheduler, percentiles
+from materials.state import State
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("recording", help="記録ファイル")
+    parser.add_argument("--repeat", type=int, default=1, help="再現する回数")
+    parser.add_argument("--speed", type=float, default=0.0, help="何倍速で流すか(0なら待たない)")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording)
+    state = None  # ラベルから参照する、再現中の状態
+    scheduler = ReplayScheduler(
+        recording, args.speed, label=lambda: state.state.name.name
+    )
+    draw = StateDraw(headless=True, scheduler=scheduler)
+    start = time.perf_counter()
+    for i in range(args.repeat):
+        random.seed(recording.seed)  # 記録したときと同じ問題が出るようにする
+        scheduler.rewind()
+        state = State(scheduler)
+        try:
+            typing_game.main(draw, state, User())
+        except ReplayFinished:
+            pass
+    elapsed = time.perf_counter() - start
+    print(
+        "{} sessions in {:.3f}s ({:.2f} sessions/s, {} events/session)".format(
+            args.repeat, elapsed, args.repeat / elapsed, len(recording.events)
+        )
+    )
+    for name, latencies in scheduler.latencies.items():
+        print("{:<7}{:>6} events  {} (ms)".format(name, len(latencies), percentiles(latencies)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pygame
+from pygame.locals import *
+
+sys.path.append(os.pardir)
+# 使用可能なビデオデバイスがないと言われるので、
+# ダミーの環境変数を通しておく
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+from game.game import QuestionResponse
+from materials.drawer import StateDraw, SurfaceCache
+from materials.scheduler import FrameScheduler
+
+
+class EachEventScheduler(FrameScheduler):
+    """溜まっている入力があっても、イベントごとに描画させるスケジューラ"""
+
+    def pending(self):
+        return False
+
+
+class TestSurfaceCache:
+    """SurfaceCacheの単体テストをするクラス"""
+
+    def test_render(self):
+        pygame.font.init()
+        font = pygame.font.SysFont("yumincho", 30)
+        cache = SurfaceCache(maxsize=2)
+        black, red = (0, 0, 0), (255, 0, 0)
+        surface = cache.render(font, "開始", True, black)
+        assert cache.render(font, "開始", True, black) is surface  # 同じSurfaceを使い回す
+        assert cache.render(font, "開始", True, red) is not surface  # 色が違えば別物
+        cache.render(font, "終了", True, black)  # 上限を超えるので最も古いものを追い出す
+        info = cache.info
+        assert (info.hits, info.misses, info.evictions, info.size) == (1, 3, 1, 2)
+        assert info.hit_rate == 0.25
+        cache.render(font, "開始", True, black)  # 追い出されているので描画しなおす
+        assert cache.info.misses == 4
+
+
+class TestStateDraw:
+    """StateDrawの単体テストをするクラス"""
+
+    def test_play_headless(self):
+        """ウィンドウを開かずに、入力したイベントどおりの解答が返ることのテスト"""
+        draw = StateDraw(headless=True)
+        for x in "script":
+            pygame.event.post(pygame.event.Event(TEXTINPUT, text=x))
+        pygame.event.post(pygame.event.Event(KEYDOWN, key=K_LEFT, unicode=""))
+        pygame.event.post(pygame.event.Event(KEYDOWN, key=K_BACKSPACE, unicode="\b"))
+        pygame.event.post(pygame.event.Event(KEYDOWN, key=K_RETURN, unicode="\r"))
+        play = draw.play("ボキャブラリーゲーム: かんたん", "0/3")
+        next(play)
+        assert play.send(QuestionResponse("スクリ○ト", "台本")) == "scrit"
+        assert draw.dirty_rects == []  # 描画した領域は更新済み
+
+    def test_dirty_rects(self):
+        """フォーカスの移動や1文字の入力では、画面全体ではなく変わった領域だけを更新することのテスト"""
+        draw = StateDraw(headless=True, scheduler=EachEventScheduler())
+        updated = []  # update()ごとに、更新された領域のリスト
+        update = draw.update
+
+        def record():
+            updated.append(list(draw.dirty_rects))
+            update()
+
+        draw.update = record
+        screen = draw.screen.get_rect()
+        draw.title(0)
+        assert screen in updated[-1]  # 最初は画面全体を描画する
+        draw.title(1)  # フォーカスの移動
+        assert updated[-1] and screen not in updated[-1]
+        # ヘッダーの枠(y=220)より下の、小見出しの行だけを描画しなおす
+        assert all(rect.top >= 220 for rect in updated[-1])
+
+        updated.clear()
+        pygame.event.post(pygame.event.Event(TEXTINPUT, text="a"))
+        pygame.event.post(pygame.event.Event(KEYDOWN, key=K_RETURN, unicode="\r"))
+        assert draw.input_text() == "a"
+        assert len(updated) == 2  # 入力開始時と、1文字入力したとき
+        # 入力欄の行だけを描画しなおす
+        line_height = draw.render(draw.font_medium, "a|").get_height()
+        assert updated[1] and screen not in updated[1]
+        for rect in updated[1]:
+            assert rect.top >= draw.height - line_height * 2
+            assert rect.bottom <= draw.height - line_height
+
+    def test_result_layout(self):
+        """リザルト画面の行が増えても、ヘッダーの枠と下のメッセージの間に収まることのテスト"""
+        draw = StateDraw(headless=True)
+        prompt = draw.make_bottom_subheader("Please press Enter...")
+        for n in [4, 8, 16]:
+            rects = draw.make_lines(["{}行目".format(i) for i in range(n)], 220, prompt.top)
+            assert rects[0].top >= 220
+            assert rects[-1].bottom <= prompt.top
+        draw.result(["ユーザー名: user", "正解数: 3", "不正解数: 0", "評価: S"])
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.append(os.pardir)
+
+from game.game import Report, ReportType, Score, percentile
+from game.sampler import WeightedSampler
+from game.word_bank import registry
+
+
+class TestScore:
+    """Scoreの単体テストをするクラス"""
+
+    def test_add_timing(self):
+        score = Score(ReportType)
+        score.add_timing(0.5, 2.5, 8)
+        score.add_timing(1.0, 1.0, 0)  # キー入力せずに解答したとき
+        assert list(score.first_key_times) == [0.5, 1.0]
+        assert list(score.submit_times) == [2.5, 1.0]
+        assert list(score.keystrokes_per_second) == [4.0, 0.0]
+        score.add_judge_latency(0.25)
+        assert list(score.judge_latencies) == [0.25]
+
+    def test_percentile(self):
+        values = [4.0, 1.0, 3.0, 2.0]
+        assert percentile(values, 50) == 2.0
+        assert percentile(values, 90) == 4.0
+        assert percentile(values, 0) == 1.0
+        assert percentile([], 50) == 0.0
+
+
+class TestReport:
+    """Reportの単体テストをするクラス"""
+
+    def test_misses_across_games(self):
+        """不正解がプロセス全体で記録され、次のゲームの選び方に使われることのテスト"""
+        registry.clear()
+        game = Report(WeightedSampler)
+        game.set_mode(ReportType.EASY.value)
+        line_number = game.words[-1]["line_number"]
+        assert not game.judge_word("").correct
+        assert registry.misses(game.file_path) == {line_number: 1}
+        next_game = Report(WeightedSampler)
+        next_game.set_mode(ReportType.EASY.value)
+        assert next_game.sampler.misses == {line_number: 1}
+        registry.clear()
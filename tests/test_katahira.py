@@ -68,3 +68,24 @@ class TestKataHira:
         for x in TestKataHira.lower_hiragana:
             is_lower_hiragana = conv.is_lower_hiragana(ord(x))
             assert is_lower_hiragana == True
+
+    def test_normalize(self):
+        """
+        normalizeがconvertを1文字ずつ呼んだものと一致することのテスト
+        """
+
+        conv = KataHira()
+        assert conv.normalize(TestKataHira.katakana) == TestKataHira.hiragana
+        # ひらがなの小文字も大文字にし、長音符はそのまま残す
+        assert conv.normalize("コーヒーぁ") == "こーひーあ"
+        assert conv.normalize_all(["リンゴ", "", "ゴリラ"]) == ["りんご", "", "ごりら"]
+
+    def test_head_tail(self):
+        """
+        head、tailのテスト
+        """
+
+        conv = KataHira()
+        assert conv.head("ャッホー") == "や"
+        assert conv.tail("コーヒー") == "ひ"
+        assert conv.tail("キッチン") == "ん"
@@ -0,0 +1,56 @@
+import os
+import sys
+from threading import Thread
+
+sys.path.append(os.pardir)
+
+from game.shiritori_server.metrics import NULL_TIMER, Registry
+
+
+class TestRegistry:
+    """Registryと計測するものの単体テストをするクラス"""
+
+    def test_disabled(self):
+        """計測しないときは何も記録されないことのテスト"""
+        registry = Registry()
+        counter = registry.counter("c_total", "help", ["mode"])
+        histogram = registry.histogram("h_seconds", "help")
+        counter.inc("名詞")
+        assert histogram.time() is NULL_TIMER
+        assert registry.render() == "\n".join(
+            ["# HELP c_total help", "# TYPE c_total counter"]
+            + ["# HELP h_seconds help", "# TYPE h_seconds histogram"]
+        ) + "\n"
+
+    def test_render(self):
+        registry = Registry(enabled=True)
+        counter = registry.counter("c_total", "help", ["mode", "outcome"])
+        histogram = registry.histogram("h_seconds", "help", ["stage"], buckets=(0.1, 1.0))
+        counter.inc("名詞", "correct")
+        counter.inc("名詞", "correct")
+        for value in (0.05, 0.1, 2.0):
+            histogram.observe(value, "parse")
+        with histogram.time("judge"):
+            pass
+        lines = registry.render().splitlines()
+        assert 'c_total{mode="名詞",outcome="correct"} 2' in lines
+        # 区切りの値ちょうどのものは、その区切りに含まれる(累積数)
+        assert 'h_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+        assert 'h_seconds_bucket{stage="parse",le="1.0"} 2' in lines
+        assert 'h_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+        assert 'h_seconds_count{stage="parse"} 3' in lines
+        assert 'h_seconds_count{stage="judge"} 1' in lines
+
+    def test_paused(self):
+        """記録を止めたスレッドの分だけが記録されないことのテスト"""
+        registry = Registry(enabled=True)
+        counter = registry.counter("c_total", "help")
+        histogram = registry.histogram("h_seconds", "help")
+        with registry.paused():
+            counter.inc()
+            assert histogram.time() is NULL_TIMER
+            thread = Thread(target=counter.inc)  # 他のスレッドは記録される
+            thread.start()
+            thread.join()
+        counter.inc()
+        assert "c_total 2" in registry.render().splitlines()
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.append(os.pardir)
+
+from game.prevalidator import PreValidator, to_hiragana
+
+
+class TestPreValidator:
+    """PreValidatorの単体テストをするクラス"""
+
+    prevalidator = PreValidator()
+
+    def test_to_hiragana(self):
+        """サーバのKataHira.convertと同じく、小文字は大文字になることのテスト"""
+        assert [to_hiragana(x) for x in "アぁッゃヮん"] == list("ああつやわん")
+
+    def test_validate(self):
+        """サーバで必ず不正解になるものだけが弾かれることのテスト"""
+        rejected = ["", "  ", "apple", "ｱｲｽ", "あ", "ごりら", "みかん", "リボンー"]
+        for word in rejected:
+            assert not self.prevalidator.validate(word, "り")[0]
+        # 漢字や小文字で始まるものは、読みが分からないのでサーバに任せる
+        plausible = ["りんご", "リュック", "林檎", "Tシャツ", "ゃんま", "コーヒー"]
+        for word in plausible:
+            assert self.prevalidator.validate(word, "り" if word[0] != "コ" else "こ")[0]
+
+    def test_uncertain_head(self):
+        """よみでは別の文字になりうる頭文字は、頭文字を判定しないことのテスト"""
+        for word, head in [("ゑびす", "え"), ("ヴィーナス", "び"), ("づつみ", "つ"), ("ヶ月", "か")]:
+            assert self.prevalidator.validate(word, head)[0]
+        assert not self.prevalidator.validate("ゑびすん", "え")[0]  # 「ん」で終わるものは弾く
@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+
+import pygame
+from pygame.locals import *
+
+sys.path.append(os.pardir)
+# 使用可能なビデオデバイスがないと言われるので、
+# ダミーの環境変数を通しておく
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+import typing_game
+from game.game import Report, ReportType
+from game.user import User
+from materials.drawer import StateDraw
+from materials.replay import Recording, RecordingScheduler, ReplayFinished, ReplayScheduler
+from materials.state import State
+
+
+def enter():
+    """エンターキー押下のイベント"""
+    return pygame.event.Event(KEYDOWN, key=K_RETURN, unicode="\r")
+
+
+class TestReplay:
+    """記録したプレイの再現のテストをするクラス"""
+
+    seed = 1
+
+    def answers(self):
+        """シードから、ボキャブラリーゲーム(かんたん)で出題される問題の答えを求める"""
+        random.seed(TestReplay.seed)
+        game = Report()
+        game.set_mode(ReportType.EASY.value)
+        answers = []
+        while not game.is_finish:
+            game.get_word()
+            answers.append(game.words[-1]["answer"])
+            game.judge_word(answers[-1])
+        return answers
+
+    def record(self, path):
+        """タイトルからリザルトまで、ボキャブラリーゲームを全問正解するプレイを記録する"""
+        pygame.init()
+        scheduler = RecordingScheduler(path, TestReplay.seed)
+        events = [enter(), pygame.event.Event(TEXTINPUT, text="user"), enter()]
+        events += [pygame.event.Event(USEREVENT), enter(), enter()]
+        for answer in self.answers():
+            events += [pygame.event.Event(TEXTINPUT, text=answer), enter()]
+        events += [enter(), pygame.event.Event(QUIT)]
+        scheduler.record(events)
+        scheduler.file.close()
+        return len(events)
+
+    def test_replay(self, tmp_path):
+        path = str(tmp_path / "session.rpl")
+        number_of_events = self.record(path)
+        recording = Recording.load(path)
+        assert recording.seed == TestReplay.seed
+        assert len(recording.events) == number_of_events
+        assert recording.events[1].attributes == {"text": "user"}
+
+        state = State()
+        scheduler = ReplayScheduler(recording, label=lambda: state.state.name.name)
+        state.scheduler = scheduler
+        user = User()
+        random.seed(recording.seed)
+        try:
+            typing_game.main(StateDraw(headless=True, scheduler=scheduler), state, user)
+        except ReplayFinished:
+            pass
+        assert user.name == "user"
+        assert user.scores[-1].number_of_corrects == ReportType.EASY.value.number_of_words
+        assert user.scores[-1].number_of_incorrects == 0
+        assert len(user.scores[-1].submit_times) == len(self.answers())  # 解答ごとに計測
+        assert set(scheduler.latencies) == {"TITLE", "USER", "TYPE", "MODE", "PLAY", "RESULT"}
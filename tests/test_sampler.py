@@ -0,0 +1,54 @@
+import os
+import sys
+from collections import Counter
+
+sys.path.append(os.pardir)
+
+from game.sampler import FenwickTree, ShuffleSampler, WeightedSampler
+
+
+class TestShuffleSampler:
+    """ShuffleSamplerの単体テストをするクラス"""
+
+    def test_sample(self):
+        """一巡するまで重複なく選ばれることのテスト"""
+        n = 100
+        sampler = ShuffleSampler(n)
+        assert sorted(sampler.sample() for i in range(n)) == list(range(n))
+        # 二巡目も同様
+        assert sorted(sampler.sample() for i in range(n)) == list(range(n))
+
+
+class TestFenwickTree:
+    """FenwickTreeの単体テストをするクラス"""
+
+    def test_find(self):
+        weights = [3, 0, 1, 2]
+        tree = FenwickTree(weights)
+        assert tree.total == 6
+        # 累積和が[3, 3, 4, 6]なので、0~2は0番目、3は2番目、4~5は3番目
+        assert [tree.find(x) for x in range(tree.total)] == [0, 0, 0, 2, 3, 3]
+        tree.add(1, 2)
+        assert tree.total == 8
+        assert [tree.find(x) for x in range(tree.total)] == [0, 0, 0, 1, 1, 2, 3, 3]
+
+
+class TestWeightedSampler:
+    """WeightedSamplerの単体テストをするクラス"""
+
+    def test_miss(self):
+        """不正解の多い単語ほど選ばれやすいことのテスト"""
+        sampler = WeightedSampler(10)
+        for i in range(10):
+            sampler.miss(3)
+        assert sampler.misses == {3: 10}
+        counts = Counter(sampler.sample() for i in range(3000))
+        # 3番目の重みは21、それ以外は1なので、3番目が最も多く選ばれる
+        assert counts.most_common(1)[0][0] == 3
+
+    def test_previous_misses(self):
+        """これまでのゲームでの不正解数が重みに反映されることのテスト"""
+        sampler = WeightedSampler(10, {3: 10, 20: 1})  # 行数を超えるものは無視する
+        assert sampler.misses == {3: 10}
+        counts = Counter(sampler.sample() for i in range(3000))
+        assert counts.most_common(1)[0][0] == 3
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.append(os.pardir)
+
+from game.shiritori_server.session import SessionStore
+
+
+class TestSessionStore:
+    """SessionStoreの単体テストをするクラス"""
+
+    def test_create(self):
+        store = SessionStore()
+        session = store.create("名詞", "り")
+        assert store.get(session.session_id) is session
+        assert store.get("unknown") is None
+        assert store.end(session.session_id) is session
+        assert store.get(session.session_id) is None
+
+    def test_expire(self):
+        """有効期限が切れたセッションは削除されることのテスト"""
+        store = SessionStore(ttl=0)
+        session = store.create("名詞", "り")
+        assert store.get(session.session_id) is None
+        assert store.info.expired == 1
+
+    def test_maxsize(self):
+        """上限を超えると、最も長く使われていないセッションが追い出されることのテスト"""
+        store = SessionStore(maxsize=2)
+        first = store.create("名詞", "り")
+        second = store.create("名詞", "り")
+        store.get(first.session_id)  # firstを使ったので、secondが最も古くなる
+        store.create("名詞", "り")
+        assert store.get(second.session_id) is None
+        assert store.get(first.session_id) is first
+        assert (store.info.size, store.info.evictions) == (2, 1)
@@ -0,0 +1,253 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.pardir)
+# サーバ側のモジュールはshiritori_serverディレクトリ直下からimportされる前提なので、
+# パスを通しておく
+sys.path.append(
+    os.path.join(os.path.dirname(__file__), os.pardir, "game", "shiritori_server")
+)
+pytest.importorskip("MeCab")  # MeCabがない環境ではスキップする
+
+from reading_index import ReadingIndex, build, index_path_of, is_built_from
+from session import SessionStore
+from shiritori import Difficulty, Judgement, Response, Shiritori, judgements_to_json
+from warmup import Warmup
+
+
+class TestShiritori:
+    """Shiritoriの単体テストをするクラス"""
+
+    shiritori = Shiritori()
+
+    def test_is_correct_word(self):
+        response = self.shiritori.is_correct_word("名詞", "りんご", "り")
+        assert response.is_correct
+        assert response.next_head == "ご"
+        response = self.shiritori.is_correct_word("名詞", "りんご", "ご")
+        assert not response.is_correct
+        assert response.next_head == "ご"  # 不正解なら頭文字は変わらない
+
+    def test_is_correct_words(self):
+        """一括判定の結果が1件ずつの判定と一致することのテスト"""
+        requests = [("名詞", "りんご", "り"), ("動詞", "走る", "は"), ("名詞", "りんご", "ご")]
+        responses = self.shiritori.is_correct_words(requests)
+        assert responses == [self.shiritori.is_correct_word(*x) for x in requests]
+
+    def test_judge_chain(self):
+        """正解したときだけ次の頭文字が更新されることのテスト"""
+        responses = self.shiritori.judge_chain("名詞", ["りんご", "らっぱ", "ごま"], "り")
+        assert [x.is_correct for x in responses] == [True, False, True]
+        assert [x.next_head for x in responses] == ["ご", "ご", "ま"]
+
+    def test_analysis_cache(self):
+        """同じ文字は形態素解析されずキャッシュから返されることのテスト"""
+        shiritori = Shiritori(cache_size=2)
+        for text in ["りんご", "りんご", "ごりら", "らっぱ"]:
+            shiritori.is_correct_word("名詞", text, "り")
+        info = shiritori.analyses.info
+        assert (info.hits, info.misses, info.evictions, info.size) == (1, 3, 1, 2)
+
+
+    def test_prevalidator(self):
+        """手元で弾いた解答は、サーバで判定しても不正解になることのテスト"""
+        from game.prevalidator import PreValidator
+
+        prevalidator = PreValidator()
+        for text in ["", "apple", "ｱｲｽ", "あ", "ごりら", "コーヒー", "りんご", "林檎"]:
+            plausible, message = prevalidator.validate(text, "り")
+            if not plausible:
+                response = self.shiritori.is_correct_word("名詞", text, "り")
+                assert not response.is_correct
+                assert message in response.message  # サーバは理由を複数つなげることがある
+        # よみの頭文字が表記と異なるものも、サーバで正解になるものは弾かない
+        for text, head in [("ゑびす", "え"), ("ヴィーナス", "び"), ("づつみ", "つ")]:
+            assert self.shiritori.is_correct_word("名詞", text, head).is_correct
+            assert prevalidator.validate(text, head)[0]
+        # 「ん」で終わるものはサーバでは正解になり、クライアント側で不正解にしている
+        response = self.shiritori.is_correct_word("名詞", "りぼん", "り")
+        assert response.next_head == "ん"
+        assert not prevalidator.validate("りぼん", "り")[0]
+
+
+class TestReadingIndex:
+    """ReadingIndexの単体テストをするクラス"""
+
+    def make_index(self, tmp_path, words):
+        words_path = tmp_path / "words.txt"
+        words_path.write_text("\n".join(words), encoding="utf-8")
+        index_path = str(tmp_path / "words.bin")
+        build(str(words_path), index_path, Shiritori().parse)
+        return ReadingIndex(index_path)
+
+    def test_lookup(self, tmp_path):
+        """登録された単語だけが引け、(品詞, 頭文字)ごとにまとまっていることのテスト"""
+        # 「あ」は1文字、「走って」は複数の単語なので登録されない
+        index = self.make_index(tmp_path, ["りんご", "走る", "りす", "赤い", "あ", "走って", "りんご"])
+        assert len(index) == 4
+        assert index.lookup("りんご").reading == "リンゴ"
+        assert index.lookup("走る").word_class == "動詞"
+        assert index.lookup("走って") is None
+        assert index.lookup("ごりら") is None
+        assert sorted(index[i].surface for i in index.candidates("名詞", "り")) == ["りす", "りんご"]
+        assert not index.candidates("動詞", "り")
+        index.close()
+
+    def test_open(self, tmp_path):
+        """一覧と同じ場所の索引が古ければ、build_dirに作成しなおして開くことのテスト"""
+        words_path = tmp_path / "words.txt"
+        words_path.write_text("りんご\n走る", encoding="utf-8")
+        index_path = index_path_of(str(words_path))
+        build(str(words_path), index_path, Shiritori().parse)
+        assert is_built_from(index_path, str(words_path))
+        index = ReadingIndex.open(str(words_path), Shiritori().parse)
+        assert len(index) == 2
+        index.close()
+
+        words_path.write_text("りんご\n走る\nりす", encoding="utf-8")
+        assert not is_built_from(index_path, str(words_path))
+        build_dir = tmp_path / "build"
+        build_dir.mkdir()
+        index = ReadingIndex.open(str(words_path), Shiritori().parse, str(build_dir))
+        assert len(index) == 3
+        index.close()
+        assert is_built_from(str(build_dir / "words.bin"), str(words_path))
+        assert not is_built_from(index_path, str(words_path))  # 元の場所には書き込まない
+
+    def test_shiritori(self, tmp_path):
+        """索引から返した結果がMeCabでの解析結果と一致し、ヒントが出せることのテスト"""
+        words = ["りんご", "走る", "コーヒー"]
+        shiritori = Shiritori(index=self.make_index(tmp_path, words))
+        for text in words:
+            assert shiritori.lookup(text) == shiritori.parse(text)
+        response = shiritori.hint("名詞", "こ")
+        assert response.is_correct
+        assert (response.word, response.next_head) == ("コーヒー", "ひ")
+        assert not shiritori.hint("名詞", "ん").is_correct
+        # 索引がないときは候補なしとして返す
+        assert not Shiritori().hint("名詞", "こ").is_correct
+
+
+class TestWordGraph:
+    """WordGraphとShiritori.opponentの単体テストをするクラス"""
+
+    def test_opponent(self, tmp_path):
+        """難易度に応じて尻の文字の続けやすさで選び、使われた単語は選ばないことのテスト"""
+        # 「ご」で始まる単語は2つ、「す」で始まる単語はないので「りす」が最も続けにくい
+        words = ["りんご", "りす", "りんかく", "ごりら", "ごま", "くま", "りぼん"]
+        index = TestReadingIndex().make_index(tmp_path, words)
+        shiritori = Shiritori(index=index)
+        assert shiritori.opponent("名詞", "り", [], Difficulty.HARD).word == "りす"
+        assert shiritori.opponent("名詞", "り", [], Difficulty.EASY).word == "りんご"
+        # 「りぼん」は「ん」で終わるので選ばれない
+        response = shiritori.opponent("名詞", "り", ["リス", "りんご"], Difficulty.HARD)
+        assert (response.word, response.next_head) == ("りんかく", "く")
+        response = shiritori.opponent("名詞", "り", ["りす", "りんご", "りんかく"], Difficulty.NORMAL)
+        assert not response.is_correct
+
+
+class TestSession:
+    """Shiritoriのセッションを使った判定の単体テストをするクラス"""
+
+    def test_judge_session(self):
+        """セッションの頭文字が更新され、同じよみの単語は使えないことのテスト"""
+        shiritori = Shiritori()
+        session = SessionStore().create("名詞", "り")
+        assert shiritori.judge_session(session, "りんご").is_correct
+        assert session.head_word == "ご"
+        assert shiritori.judge_session(session, "ゴリラ").is_correct
+        assert shiritori.judge_session(session, "らっぱ").is_correct
+        # 「らっぱ」の次は「ぱ」だが、頭文字を戻して同じよみの単語を試す
+        session.head_word = "り"
+        response = shiritori.judge_session(session, "リンゴ")
+        assert not response.is_correct
+        assert response.message == "すでに使われた単語です。"
+        response = shiritori.judge_session(session, "りぼん")
+        assert not response.is_correct
+        assert session.head_word == "り"
+        # よみはKataHiraと同じく、小文字を大文字にして記録される
+        assert session.used == {"りんご", "ごりら", "らつぱ"}
+
+    def test_move_session(self, tmp_path):
+        """コンピュータの手は、選んだ索引の単語のよみで記録されることのテスト"""
+        index = TestReadingIndex().make_index(tmp_path, ["りんご", "ごま"])
+        shiritori = Shiritori(index=index)
+        # 解析しなおしてもよみは使わない
+        shiritori.analyze = lambda text: None
+        session = SessionStore().create("名詞", "り")
+        response = shiritori.move_session(session, Difficulty.HARD)
+        assert (response.word, response.next_head) == ("りんご", "ご")
+        assert session.used == {"りんご"}
+        assert session.head_word == "ご"
+        assert shiritori.move_session(session, Difficulty.HARD).word == "ごま"
+        assert not shiritori.move_session(session, Difficulty.HARD).is_correct
+        assert session.head_word == "ま"
+
+
+class TestJudgement:
+    """Judgementの単体テストをするクラス"""
+
+    def test_to_json(self):
+        """Responseをレスポンスに使ったときと同じJSONになることのテスト"""
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+
+        judgements = [
+            Judgement("りんご", "名詞", True, "", "ご"),
+            Judgement('"a\\b"\n', "", False, "日本語以外が含まれている可能性があります。", "り"),
+        ]
+        for judgement in judgements:
+            response = Response(**judgement._asdict())
+            assert judgement.to_json() == JSONResponse(jsonable_encoder(response)).body
+        responses = [Response(**x._asdict()) for x in judgements]
+        assert judgements_to_json(judgements) == JSONResponse(
+            jsonable_encoder(responses)
+        ).body
+
+
+class TestWarmup:
+    """Warmupの単体テストをするクラス"""
+
+    def test_run(self):
+        """準備が終わると解析結果がキャッシュされ、準備済みと報告されることのテスト"""
+        shiritori = Shiritori()
+        warmup = Warmup(shiritori, ["りんご", "走る"])
+        assert not warmup.status.ready
+        assert not warmup.wait(0)
+        warmup.run()
+        warmup.run()  # 2回目は何もしない
+        assert warmup.wait(0)
+        assert warmup.status.ready
+        assert warmup.status.words == 2
+        assert shiritori.analyses.info.size == 2
+
+    def test_metrics(self):
+        """準備のための判定は計測結果に含まれないことのテスト"""
+        from metrics import registry
+
+        registry.enabled = True
+        try:
+            Warmup(Shiritori(), ["りんご", "走る"]).run()
+            rendered = registry.render()
+        finally:
+            registry.enabled = False
+        assert "shiritori_judgements_total{" not in rendered
+        assert "shiritori_stage_seconds_count{" not in rendered
+
+
+class TestLocalShiritoriClient:
+    """LocalShiritoriClientの単体テストをするクラス"""
+
+    def test_shiritori(self):
+        """サーバと同じ形式の辞書が返ることのテスト"""
+        from game.shiritori_local import LocalShiritoriClient
+
+        client = LocalShiritoriClient()
+        assert client.set_mode(0)
+        assert not client.set_mode(len(client.modes))  # 存在しない品詞
+        result = client.shiritori("りんご", "り")
+        assert result["is_correct"]
+        assert result["next_head"] == "ご"
+        assert len(client.get_head_word()["next_head"]) == 1
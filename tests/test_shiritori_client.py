@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+sys.path.append(os.pardir)
+
+from game import shiritori_client, shiritori_local
+from game.shiritori_client import ShiritoriClient
+from game.shiritori_local import (
+    LocalShiritoriClient,
+    get_client,
+    import_server,
+    make_client,
+)
+
+MODES = {"0": "名詞", "1": "動詞", "2": "形容詞"}
+
+
+class FakeClient(ShiritoriClient):
+    """サーバの代わりに、品詞の一覧をETag付きで返すクライアント"""
+
+    etag = '"modes"'
+
+    def __init__(self) -> None:
+        self.requests = []  # 送られたリクエストのヘッダ
+        super().__init__()
+
+    def fetch(self, url, headers=None):
+        self.requests.append(headers or {})
+        response_headers = {"etag": self.etag, "cache-control": "public, max-age=60"}
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return 304, response_headers, b""
+        return 200, response_headers, json.dumps(MODES).encode("utf-8")
+
+
+class TestShiritoriClient:
+    """ShiritoriClientの品詞の一覧の保存の単体テストをするクラス"""
+
+    def test_modes_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ShiritoriClient, "modes_cache", str(tmp_path / "modes.json"))
+        # 保存したものがないので、サーバから取得して保存する
+        client = FakeClient()
+        client.submit(lambda: None).result()  # 裏の処理が終わるのを待つ
+        assert client.modes == MODES
+        assert client.requests == [{}]
+        assert not client.set_mode(3)
+        assert client.set_mode(1)
+
+        # 有効期限内であれば、サーバに問い合わせずに使う
+        client = FakeClient()
+        assert client.modes == MODES
+        client.submit(lambda: None).result()
+        assert client.requests == []
+
+        # 有効期限が切れていれば、ETagを送って変わっていないことを確かめる
+        with open(ShiritoriClient.modes_cache, encoding="utf-8") as f:
+            cache = json.load(f)
+        cache["expires"] = time.time() - 1
+        with open(ShiritoriClient.modes_cache, mode="w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        client = FakeClient()
+        client.submit(lambda: None).result()
+        assert client.requests == [{"If-None-Match": '"modes"'}]
+        assert client.modes == MODES
+        assert client.read_modes_cache()["expires"] > time.time()
+
+
+class TestMakeClient:
+    """make_clientとget_clientの単体テストをするクラス"""
+
+    def test_fallback(self, tmp_path, monkeypatch):
+        """MeCabの辞書がなくTaggerを作れないときは、サーバに問い合わせるクライアントになることのテスト"""
+        monkeypatch.setattr(ShiritoriClient, "modes_cache", str(tmp_path / "modes.json"))
+        # 品詞の一覧は保存したものを使い、サーバには問い合わせない
+        with open(ShiritoriClient.modes_cache, mode="w", encoding="utf-8") as f:
+            json.dump({"modes": MODES, "etag": "", "expires": time.time() + 60}, f)
+
+        def no_dictionary(self):
+            raise RuntimeError("MeCabの辞書が見つかりません")
+
+        monkeypatch.setattr(LocalShiritoriClient, "__init__", no_dictionary)
+        monkeypatch.delenv("SHIRITORI_BACKEND", raising=False)
+        client = make_client()
+        assert type(client) is ShiritoriClient
+        monkeypatch.setenv("SHIRITORI_BACKEND", "local")
+        with pytest.raises(RuntimeError):  # localを指定したときは例外をそのまま送出する
+            make_client()
+
+        # get_clientは最初に作ったクライアントを使いまわす
+        monkeypatch.setenv("SHIRITORI_BACKEND", "http")
+        monkeypatch.setattr(shiritori_local, "shared_client", None)
+        assert get_client() is get_client()
+
+    def test_import_server(self, monkeypatch):
+        """サーバ側のモジュールを、パスを変えずに必要なものを確かめてimportすることのテスト"""
+        path = list(sys.path)
+        monkeypatch.setattr(shiritori_local, "SERVER_REQUIREMENTS", ["no_such_package"])
+        with pytest.raises(ImportError, match="no_such_package"):
+            import_server()
+        monkeypatch.setattr(shiritori_local, "SERVER_REQUIREMENTS", [])
+        # インストールされた同じ名前のモジュールは使わない
+        monkeypatch.setitem(sys.modules, "katahira", json)
+        with pytest.raises(ImportError, match="katahira"):
+            import_server()
+        assert sys.path == path
+
+
+class ClosingHandler(BaseHTTPRequestHandler):
+    """
+    keep-aliveで応答した後、次のリクエストを待たずに接続を閉じるハンドラ
+    (しばらく使われなかった接続をサーバが閉じたときの再現)
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps(MODES).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = True  # クライアントには知らせずに閉じる
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFetch:
+    """ShiritoriClient.fetchの再試行の単体テストをするクラス"""
+
+    def test_stale_connection(self, tmp_path, monkeypatch):
+        """使い回した接続がサーバに閉じられていたときは、待たずに張り直すことのテスト"""
+        monkeypatch.setattr(ShiritoriClient, "modes_cache", str(tmp_path / "modes.json"))
+        with open(ShiritoriClient.modes_cache, mode="w", encoding="utf-8") as f:
+            json.dump({"modes": MODES, "etag": "", "expires": time.time() + 60}, f)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ClosingHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            monkeypatch.setattr(
+                ShiritoriClient, "host", "http://127.0.0.1:{}".format(server.server_port)
+            )
+            monkeypatch.setattr(ShiritoriClient, "backoff", 10.0)  # 待てばテストが終わらない
+            client = ShiritoriClient()
+            assert client.request(client.host + "modes/") == MODES
+            time.sleep(0.1)  # サーバが接続を閉じるのを待つ
+            started = time.perf_counter()
+            assert client.request(client.host + "modes/") == MODES
+            assert time.perf_counter() - started < 1.0
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_backoff(self, tmp_path, monkeypatch):
+        """張り直した接続でも失敗したときは、待ってから再試行することのテスト"""
+        monkeypatch.setattr(ShiritoriClient, "modes_cache", str(tmp_path / "modes.json"))
+        with open(ShiritoriClient.modes_cache, mode="w", encoding="utf-8") as f:
+            json.dump({"modes": MODES, "etag": "", "expires": time.time() + 60}, f)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ClosingHandler)
+        port = server.server_port
+        server.server_close()  # 接続できないポートにする
+        monkeypatch.setattr(ShiritoriClient, "host", "http://127.0.0.1:{}".format(port))
+        waits = []
+        monkeypatch.setattr(shiritori_client, "sleep", waits.append)
+        client = ShiritoriClient()
+        with pytest.raises(Exception):
+            client.request(client.host + "modes/")
+        assert waits == [0.5, 1.0]
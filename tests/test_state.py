@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 
 import pygame
 from pygame.locals import *
@@ -97,3 +98,16 @@ class TestState:
         state.event()  # イベント処理
         assert state.state == state.states[0]  # TITLEに遷移
 
+    def test_event_timeout(self):
+        """イベントがないときはtimeoutミリ秒待って、状態が変わらないことのテスト"""
+        pygame.display.init()
+        state = State()
+        pygame.event.clear()
+        start = time.monotonic()
+        state.event(50)
+        assert time.monotonic() - start >= 0.04
+        assert state.state == state.states[0]  # TITLEのまま
+        # イベントがあれば待たずに処理される
+        pygame.event.post(pygame.event.Event(KEYDOWN, key=K_RETURN))
+        state.event(1000)
+        assert state.state == state.states[1]  # USERに遷移
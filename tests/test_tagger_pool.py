@@ -0,0 +1,30 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+sys.path.append(os.pardir)
+
+from game.shiritori_server.tagger_pool import TaggerPool
+
+
+class TestTaggerPool:
+    """TaggerPoolの単体テストをするクラス"""
+
+    def test_checkout(self):
+        """貸し出し中のものは他のスレッドに貸し出されないことのテスト"""
+        pool = TaggerPool(count().__next__, 2)
+        in_use = set()
+
+        def work(i):
+            with pool.checkout() as item:
+                assert item not in in_use
+                in_use.add(item)
+                in_use.discard(item)
+                return item
+
+        with ThreadPoolExecutor(4) as executor:
+            assert set(executor.map(work, range(100))) <= {0, 1}
+        assert pool.available() == 2
+        with pool.checkout():
+            assert pool.available() == 1
@@ -55,3 +55,31 @@ class TestText:
             text.move_cursor_right()
             assert text.cursor_pos == i + 1
 
+    def test_display(self):
+        """文字列を返さない操作の結果が、displayで表示されることのテスト"""
+        text = Text(capacity=2)
+        text.insert_text("HelloWorld")  # バッファを広げる
+        text.move_left()
+        text.delete_char()
+        assert text.display == "HelloWor|d"
+        text.set_editing("こ", 1)
+        assert text.display == "HelloWor[こ|]d"
+        assert format(text) == "HelloWor|d"  # 編集中の文字列は入力されたテキストに含めない
+        text.insert_text("個")
+        text.move_right()
+        assert text.display == "HelloWor個d|"
+        assert text.enter() == "HelloWor個d"
+        assert text.display == "|"
+
+    def test_cursor_pos(self):
+        """cursor_posに代入した位置に追加し、表示されるカーソルは動かさないことのテスト"""
+        text = Text()
+        text.input("HelloWorld")
+        text.move_cursor_left()
+        text.cursor_pos = 0
+        assert text.input(">") == ">HelloWorl|d"
+        assert text.cursor_pos == 1
+        text.cursor_pos = 12  # カーソルより後ろ
+        assert text.input("!") == ">HelloWorl|d!"
+        assert text.move_cursor_left() == ">HelloWorld|!"  # 追加する位置から動かす
+        assert text.enter() == ">HelloWorld!"
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.pardir)
+
+from game.word_bank import Word, WordBank, WordBankRegistry, bank_path_of, build
+
+
+class TestWordBank:
+    """WordBankの単体テストをするクラス"""
+
+    rows = [
+        ("スクリプト", "script", "台本、脚本などの意味を持つ英単語。"),
+        ("Web", "World Wide Web", "文書の公開・閲覧システム。"),
+    ]
+
+    def make_csv(self, tmp_path):
+        """テスト用のcsvファイルを作成する"""
+        csv_path = str(tmp_path / "words.csv")
+        with open(csv_path, mode="w", encoding="shift_jis") as f:
+            for row in TestWordBank.rows:
+                f.write('"{}","{}","{}",\n'.format(*row))
+        return csv_path
+
+    def test_build(self, tmp_path):
+        csv_path = self.make_csv(tmp_path)
+        assert build(csv_path, bank_path_of(csv_path)) == len(TestWordBank.rows)
+        bank = WordBank(bank_path_of(csv_path))
+        assert len(bank) == len(TestWordBank.rows)
+        for i, row in enumerate(TestWordBank.rows):
+            assert bank[i] == Word(*row)
+        with pytest.raises(IndexError):
+            bank[len(TestWordBank.rows)]
+        bank.close()
+
+    def test_open(self, tmp_path):
+        """単語帳がなければcsvから作成されることのテスト"""
+        csv_path = self.make_csv(tmp_path)
+        assert not os.path.exists(bank_path_of(csv_path))
+        bank = WordBank.open(csv_path)
+        assert os.path.exists(bank_path_of(csv_path))
+        assert bank[1].answer == "World Wide Web"
+        bank.close()
+
+
+class TestWordBankRegistry:
+    """WordBankRegistryの単体テストをするクラス"""
+
+    def test_get(self, tmp_path):
+        """同じ単語帳が共有され、csvが更新されると開きなおされることのテスト"""
+        csv_path = TestWordBank().make_csv(tmp_path)
+        registry = WordBankRegistry()
+        bank = registry.get(csv_path)
+        assert registry.get(csv_path) is bank
+        with open(csv_path, mode="a", encoding="shift_jis") as f:
+            f.write('"SNS","Social Networking Service","オンラインサービス。",\n')
+        os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 1))
+        reloaded = registry.get(csv_path)
+        assert reloaded is not bank
+        assert len(reloaded) == len(TestWordBank.rows) + 1
+
+    def test_miss(self, tmp_path):
+        """不正解数が共有され、csvが更新されると数えなおされることのテスト"""
+        csv_path = TestWordBank().make_csv(tmp_path)
+        registry = WordBankRegistry()
+        registry.get(csv_path)
+        registry.miss(csv_path, 1)
+        registry.miss(csv_path, 1)
+        assert registry.misses(csv_path) == {1: 2}
+        os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 1))
+        registry.get(csv_path)
+        assert registry.misses(csv_path) == {}
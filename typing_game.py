@@ -1,19 +1,34 @@
+import argparse
+import random
+
 from game.game import Report, Shiritori
+from game.sampler import SAMPLERS, ShuffleSampler
 from game.user import User
 from materials.drawer import StateDraw
+from materials.replay import RecordingScheduler
 from materials.state import State, States
 
 
-def main():
+def main(draw=None, state=None, user=None, sampler_type=ShuffleSampler):
+    """
+    ゲームのメインループ
+    draw, state, userを渡すと、それを使ってプレイする(記録したプレイの再現などに使う)
+    sampler_typeはボキャブラリーゲームで出題する単語の選び方
+    """
     # 描画を担当するクラス(ここでpygameの初期化を行う)
-    draw = StateDraw()
-    state = State()  # 状態を管理するクラス
-    user = User()  # ユーザー情報(スコアや名前)を管理するクラス
+    draw = draw if draw is not None else StateDraw()
+    # 状態を管理するクラス(イベントは描画側と同じところから受け取る)
+    state = state if state is not None else State(draw.scheduler)
+    # ユーザー情報(スコアや名前)を管理するクラス
+    user = user if user is not None else User()
     # gameモジュールでAGameを継承しているクラスのリスト
     game_types = [Report, Shiritori]
+    game_args = {Report: (sampler_type,)}  # インスタンス化するときの引数
     game = None  # ゲームのインスタンスを格納する変数
     while True:
-        state.event()  # キーダウンに応じて状態遷移
+        # キーダウンに応じて状態遷移
+        # 描画済みで何も変わらないときは、イベントが来るまで待つ
+        state.event(draw.scheduler.idle_timeout if state.is_running else 0)
         if not state.is_running:  # 再描画(描画の更新)をする必要があるなら
             if state.state.name == States.TITLE:
                 draw.title(state.selector.position)  # タイトル画面の描画
@@ -25,7 +40,11 @@ def main():
                 user.name = user_name  # ユーザーインスタンスのnameに名前をセットする
             elif state.state.name == States.TYPE:
                 draw.choose_type(state.selector.position)  # ゲームタイプの描画
-                game = game_types[state.selector.position]()  # 選択された方をインスタンス化
+                # 選択された方をインスタンス化
+                # (しりとりは頭文字の取得を始めるので、選択が変わったときだけにする)
+                if not isinstance(game, game_types[state.selector.position]):
+                    game_type = game_types[state.selector.position]
+                    game = game_type(*game_args.get(game_type, ()))
             elif state.state.name == States.MODE:
                 game_modes = game.get_mode()  # そのゲームのモード(難易度)取得
                 game_modes_list = [str(i.value) for i in game_modes]
@@ -38,19 +57,42 @@ def main():
                     play = draw.play(format(game), game.progress)
                     next(play)
                     # draw.play、左辺値questionに出題ワードを渡す
-                    input_text = play.send(game.get_word())
+                    # (通信を待つ間も画面が固まらないよう、draw.waitで待つ)
+                    input_text = play.send(draw.wait(game.get_word_async()))
+                    game.score.add_timing(*draw.input_timing)  # 入力にかかった時間を記録する
                     try:
                         # draw.play、左辺値judgeに判定結果を渡す
-                        play.send(game.judge_word(input_text))
+                        play.send(draw.wait(game.judge_word_async(input_text)))
                     except StopIteration:
                         pass
                 user.add_score(game.score)  # ユーザーにスコアを追加する
+                game = None  # 次のゲームでは新たにインスタンス化する
                 state.transition()  # ゲームプレイが終わると自動で結果画面に遷移させる
                 continue
             elif state.state.name == States.RESULT:
                 draw.result(format(user).split("\n"))  # リザルト画面の描画
             state.is_running = True  # 描画済みであることをstateに知らせる
+        draw.scheduler.tick()  # 目標のフレームレートを超えないように待つ
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", help="プレイ中のイベントを記録するファイル(replay_game.pyで再現できる)")
+    parser.add_argument(
+        "--sampler",
+        choices=list(SAMPLERS),
+        default="shuffle",
+        help="ボキャブラリーゲームの単語の選び方(weightedは不正解の多い単語ほど出やすい)",
+    )
+    args = parser.parse_args()
+    sampler_type = SAMPLERS[args.sampler]
+    if args.record:
+        # 再現したときに同じ問題が出るように、乱数のシードも記録する
+        seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        main(
+            StateDraw(scheduler=RecordingScheduler(args.record, seed)),
+            sampler_type=sampler_type,
+        )
+    else:
+        main(sampler_type=sampler_type)